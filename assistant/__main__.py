@@ -3,61 +3,136 @@ import signal
 from dotenv import load_dotenv
 import yaml
 from box import Box
-from assistant.language_model.action import run_action
+from assistant.language_model.action import Action, run_actions, tools
 from assistant.language_model.model import LanguageModel
-from assistant.language_model.tools import select_action
-from assistant.speech_to_text.model import Transcriber
+from assistant.language_model.speculation import SpeculativeRouter
+from assistant.language_model.utils import prompts
+from assistant.language_model.tools import answer_question, call_tools, select_action
+from assistant.metrics import REGISTRY, start_exporter, timed
+from assistant.speech_to_text.backends import get_transcriber
 import logging
 from assistant.text_to_speech.model import TTS
-from assistant.utils import contains_wake_word
+from assistant.text_to_speech.sentences import Prefetch, split_sentences
+from assistant.utils import WakeWordMatcher
+import time
 import traceback
 
 log_ = logging.getLogger(__name__)
 
 def main(config: Box):
     """Start voice assistant service."""
-    transcriber = Transcriber(config=config)
+    start_exporter(config)
+    if config.language_model.prewarm_tools:
+        tools.prewarm()
+    transcriber = get_transcriber(config=config)
     llm = LanguageModel(config=config)
     tts = TTS(config=config)
+    wake_word_matcher = WakeWordMatcher.from_config(config)
+    router = None
+    if config.speech_to_text.speculation.enabled and not config.language_model.native_tool_calling:
+        router = SpeculativeRouter(llm=llm, config=config)
+        transcriber.on_partial = router.on_partial
     log_.info("Initialized transcriber, llm client.")
     try:
-        for transcription in transcriber.start():
+        for utterance in transcriber.start():
             try:
-                handle_transcription(transcription=transcription, llm=llm, tts=tts)
+                handle_transcription(
+                    transcription=utterance.text,
+                    llm=llm,
+                    tts=tts,
+                    wake_word_matcher=wake_word_matcher,
+                    router=router,
+                )
             except Exception as e:
                 log_.warning("Something went wrong!")
                 log_.warning(traceback.format_exc())
                 tts.stream_audio(text=config.error_message, config=config)
+        log_.error("Transcriber stopped, exiting.")
     except KeyboardInterrupt:
         log_.info("Stopping assistant loop.")
+        if llm.cache:
+            log_.info(f"LLM cache stats: {llm.cache.stats()}")
+        for backend in llm.backends.values():
+            if backend.async_model:
+                log_.info(f"LLM request stats for {backend.name}: {backend.async_model.stats()}")
+        log_.info(f"Prompt render stats: {prompts.stats()}")
+        log_.info(f"JSON answer stats: {llm.json_stats()}")
         raise KeyboardInterrupt()
 
-def handle_transcription(transcription:str, llm:LanguageModel, tts: TTS):
+def handle_transcription(
+    transcription: str,
+    llm: LanguageModel,
+    tts: TTS,
+    wake_word_matcher: WakeWordMatcher,
+    router: SpeculativeRouter | None = None,
+):
     """Handle transcription."""
 
     if transcription:
         log_.info(f"Got transcription {transcription}.")
-        if transcription and contains_wake_word(
-            sentence=transcription,
-            wake_word=config.speech_to_text.wake_word,
-            threshold=config.speech_to_text.similarity_score,
-        ):
+        if transcription and wake_word_matcher.matches(transcription):
             log_.info("Recognized wake word.")
-            action, message = select_action.main(
-                query=transcription,
-                llm=llm,
-                config=config
-            )
-            log_.info(f"Chose action {action}, returned message {message}")
-            tts.stream_audio(text=message, config=config)
-            response = run_action(
-                action=action,
-                query=transcription,
-                llm=llm,
-                config=config
-            )
-            tts.stream_audio(text=response, config=config)
-            log_.info(response)
+            with timed("utterance"):
+                stream_sentences = config.text_to_speech.stream_sentences
+                if config.language_model.native_tool_calling:
+                    if stream_sentences:
+                        response = tts.stream_sentences(
+                            split_sentences(call_tools.stream(query=transcription, llm=llm, config=config)),
+                            config=config,
+                        )
+                    else:
+                        response = call_tools.main(
+                            query=transcription,
+                            llm=llm,
+                            config=config,
+                        )
+                        if response:
+                            tts.stream_audio(text=response, config=config)
+                else:
+                    with timed("select_action"):
+                        if router:
+                            actions, message = router.select_action(transcription)
+                        else:
+                            actions, message = select_action.main(
+                                query=transcription,
+                                llm=llm,
+                                config=config
+                            )
+                    log_.info(f"Chose actions {actions}, returned message {message}")
+                    # The action runs while the confirmation plays, the response is played after it.
+                    confirmation = tts.speak_in_background(text=message, config=config)
+                    if stream_sentences and [action for action, _ in actions] == [Action.ANSWER_QUESTION.value]:
+                        sentences = Prefetch(split_sentences(answer_question.stream(query=transcription, llm=llm)))
+                        try:
+                            confirmation_seconds = confirmation.result()
+                            # The answer was generated while the confirmation played, until its first sentence was ready.
+                            first_sentence_seconds = sentences.first_item_seconds
+                            REGISTRY.observe(
+                                "confirmation_overlap",
+                                confirmation_seconds if first_sentence_seconds is None
+                                else min(first_sentence_seconds, confirmation_seconds),
+                            )
+                            response = tts.stream_sentences(sentences, config=config)
+                        finally:
+                            sentences.close()
+                    else:
+                        start = time.perf_counter()
+                        try:
+                            response = run_actions(
+                                actions=actions,
+                                llm=llm,
+                                config=config
+                            )
+                            action_seconds = time.perf_counter() - start
+                        finally:
+                            confirmation_seconds = confirmation.result()
+                        # Time that used to be spent waiting for the confirmation before the action started.
+                        REGISTRY.observe("confirmation_overlap", min(action_seconds, confirmation_seconds))
+                        if response:
+                            tts.stream_audio(text=response, config=config)
+                log_.info(response)
+                if llm.memory and response:
+                    llm.memory.add_turn(user=transcription, assistant=response)
 
 
 
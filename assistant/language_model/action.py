@@ -1,8 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
+from functools import partial
+import importlib
+import logging
+import threading
+from types import ModuleType
+from typing import Callable
 from box import Box
 
+from assistant.metrics import timed
 from assistant.language_model.model import LanguageModel
-from assistant.language_model.tools import answer_question, get_weather, light_control, music_control
+from assistant.language_model.utils import load_prompt
+
+_log = logging.getLogger(__name__)
+ACTIONS = "actions"
+MAX_PARALLEL_ACTIONS = 4
+
+_pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_ACTIONS, thread_name_prefix="action")
 
 class Action(Enum):
     """List of actions."""
@@ -12,33 +26,151 @@ class Action(Enum):
     ANSWER_QUESTION = auto()
     MUSIC_CONTROL = auto()
 
+
+class ToolRegistry:
+    """
+    Tools declared in actions.yaml, imported on first use.
+
+    Every action names the module implementing it, with a main function and, if it
+    is marked with tool_calling, tool_schema and run_tool. Importing a tool
+    pulls in its dependencies (duckdb, pandas, dirigera, spotipy...), so inactive
+    tools are never imported and active ones can be prewarmed in the background.
+    """
+
+    def __init__(self, actions_prompt: str = ACTIONS):
+        """Create registry, actions are read from the prompt file so edits are picked up."""
+        self.actions_prompt = actions_prompt
+        self._modules: dict[str, ModuleType] = {}
+        self._import_locks: dict[str, threading.Lock] = {} # one per tool, so imports run in parallel
+        self._lock = threading.Lock() # guards _import_locks
+
+    def active(self) -> dict[str, Box]:
+        """Declarations of the active tools by name."""
+        return {
+            name: action
+            for name, action in load_prompt(self.actions_prompt).items()
+            if action.active
+        }
+
+    def name(self, number: int) -> str | None:
+        """Name of the active tool with an action number, None if there is none."""
+        for name, action in self.active().items():
+            if action.number == number:
+                return name
+        return None
+
+    def get(self, name: str) -> ModuleType:
+        """Module of an active tool, imported on first use."""
+        action = self.active().get(name)
+        if action is None:
+            raise KeyError(f"No active tool named {name}.")
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        with self._lock:
+            import_lock = self._import_locks.setdefault(name, threading.Lock())
+        with import_lock:
+            if name not in self._modules:
+                with timed("import_tool", name):
+                    self._modules[name] = importlib.import_module(action.module)
+                _log.info(f"Imported tool {name} from {action.module}.")
+            return self._modules[name]
+
+    def prewarm(self) -> threading.Thread:
+        """Import all active tools on a background thread."""
+        def import_all():
+            for name in self.active():
+                try:
+                    self.get(name)
+                except Exception:
+                    _log.exception(f"Failed to import tool {name}.")
+
+        thread = threading.Thread(target=import_all, daemon=True)
+        thread.start()
+        return thread
+
+    def describe(self) -> dict[str, dict]:
+        """Number and description of the active tools, for the select_action prompt."""
+        return {
+            name: {"description": action.description, "number": action.number}
+            for name, action in self.active().items()
+        }
+
+
+tools = ToolRegistry()
+
+
 def run_action(
     action: Action,
     query: str,
     llm: LanguageModel,
     config: Box,
 ) -> str:
-    """Run action."""
-    match action:
-        case Action.GET_WEATHER.value:
-            return get_weather.main(
-                query=query,
-                llm=llm,
-            )
-        case Action.LIGHT_CONTROL.value: 
-            return light_control.main(
-                query=query,
-                llm=llm,
-                config=config,
-            )
-        case Action.ANSWER_QUESTION.value:
-            return answer_question.main(
-                query=query,
-                llm=llm,
-            )
-        case Action.MUSIC_CONTROL.value:
-            return music_control.main(
-                query=query,
-                llm=llm,
-                config=config,
-            )
\ No newline at end of file
+    """Run action, the response is empty if there is no active tool for it (e.g. NO_ACTION)."""
+    name = tools.name(action)
+    if name is None:
+        _log.warning(f"No active tool for action {action}.")
+        return ""
+    with timed("action", name):
+        return tools.get(name).main(
+            query=query,
+            llm=llm,
+            config=config,
+        )
+
+
+def run_concurrently(calls: list[Callable[[], str]], config: Box) -> str:
+    """
+    Run independent actions in parallel and merge their responses in order.
+
+    A failed action is replaced by the error message, so the others are still spoken.
+    A single action is run directly.
+    """
+    if len(calls) == 1:
+        return calls[0]()
+    responses = []
+    for future in [_pool.submit(call) for call in calls]:
+        try:
+            responses.append(future.result())
+        except Exception:
+            _log.exception("Action failed.")
+            responses.append(config.error_message)
+    return " ".join(response for response in responses if response)
+
+
+def run_actions(
+    actions: list[tuple[Action, str]],
+    llm: LanguageModel,
+    config: Box,
+) -> str:
+    """Run every action on its part of the query concurrently, return one merged response."""
+    return run_concurrently(
+        [partial(run_action, action=action, query=query, llm=llm, config=config) for action, query in actions],
+        config=config,
+    )
+
+
+def tool_schemas(config: Box) -> list[dict]:
+    """Schemas of all active tools that support native tool calling, other tools are not imported."""
+    return [
+        tools.get(name).tool_schema(config)
+        for name, action in tools.active().items()
+        if action.get("tool_calling", False)
+    ]
+
+
+def run_tool_call(
+    name: str,
+    arguments: dict,
+    query: str,
+    llm: LanguageModel,
+    config: Box,
+) -> str:
+    """Run tool chosen by native tool calling with the arguments the model resolved."""
+    with timed("action", name):
+        return tools.get(name).run_tool(
+            arguments=arguments,
+            query=query,
+            llm=llm,
+            config=config,
+        )
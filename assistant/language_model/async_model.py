@@ -0,0 +1,214 @@
+import asyncio
+from collections import deque
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Coroutine
+from box import Box
+import numpy as np
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+from openai.types.chat import ChatCompletionMessage
+
+from assistant.constants import OPENAI_API_KEY, OPENAI_ORGANIZATION
+
+_log = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful requests, in seconds."""
+
+    def __init__(self, window: int):
+        """Keep the last window latencies."""
+        self._latencies = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, seconds: float) -> None:
+        """Add a latency."""
+        self._latencies.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Quantile of the recorded latencies, None if there are none."""
+        if not self._latencies:
+            return None
+        return float(np.quantile(self._latencies, q))
+
+
+class AsyncLanguageModel:
+    """
+    Async OpenAI client with deadlines, retries and hedged requests.
+
+    A single AsyncOpenAI client is shared by all calls, so connections are pooled and
+    kept alive between commands. Every call has a deadline covering all attempts.
+    Failed attempts are retried with exponential backoff and full jitter. With hedging
+    enabled, a duplicate request is sent when the first has been running for longer
+    than the hedge_quantile of recent latencies, and whichever answers first is used.
+    """
+
+    def __init__(
+        self,
+        config: Box,
+        model: str | None = None,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        organization: str | None = None,
+    ):
+        """
+        Initialize client from the language_model config.
+
+        By default the configured OpenAI model is used, pass model, base_url and
+        credentials to use another OpenAI compatible backend.
+        """
+        async_config = config.language_model.async_client
+        self.client = AsyncOpenAI(
+            api_key=api_key or os.getenv(OPENAI_API_KEY),
+            organization=organization or os.getenv(OPENAI_ORGANIZATION),
+            base_url=base_url or config.language_model.base_url,
+            max_retries=0, # retries are done here, within the deadline
+        )
+        self.extra_instructions = config.language_model.extra_instructions
+        self.model = model or config.language_model.model
+        self.deadline = async_config.deadline_seconds
+        self.max_retries = async_config.max_retries
+        self.backoff_base = async_config.backoff_base_seconds
+        self.backoff_max = async_config.backoff_max_seconds
+        self.hedging = async_config.hedging.enabled
+        self.hedge_quantile = async_config.hedging.quantile
+        self.hedge_min_samples = async_config.hedging.min_samples
+        self.latencies = LatencyTracker(window=async_config.latency_window)
+
+        self.n_requests = 0
+        self.n_retries = 0
+        self.n_hedges = 0
+        self.n_hedge_wins = 0 # hedged request answered before the original
+        self.n_deadlines_exceeded = 0
+
+    async def answer_prompt(
+        self,
+        system_prompt: str | None,
+        user_prompt: str,
+        use_extra_instructions: bool = True,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> ChatCompletionMessage:
+        """Answer prompt within deadline seconds, extra kwargs are passed on to the API."""
+        system_prompt = system_prompt if system_prompt else "You are a helpful assistant."
+        if use_extra_instructions:
+            system_prompt += " " + self.extra_instructions
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        return await self.complete(messages, deadline=deadline, **kwargs)
+
+    async def complete(
+        self,
+        messages: list[dict],
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> ChatCompletionMessage:
+        """Request a completion of messages within deadline seconds."""
+        deadline = deadline or self.deadline
+        try:
+            return await asyncio.wait_for(self._with_retries(messages, kwargs), timeout=deadline)
+        except asyncio.TimeoutError:
+            self.n_deadlines_exceeded += 1
+            raise TimeoutError(f"No answer from {self.model} within {deadline} s.")
+
+    async def _with_retries(self, messages: list[dict], kwargs: dict) -> ChatCompletionMessage:
+        """Request with bounded retries and jittered exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._hedged(messages, kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                _log.warning(f"Request failed ({e.__class__.__name__}), retrying in {backoff:.2f} s.")
+                self.n_retries += 1
+                await asyncio.sleep(backoff)
+
+    async def _hedged(self, messages: list[dict], kwargs: dict) -> ChatCompletionMessage:
+        """Send the request, and a duplicate if it is slower than usual."""
+        first = asyncio.create_task(self._request(messages, kwargs))
+        tasks = [first]
+        try: # cancel what is still running on return, error or cancellation by the deadline
+            if not self.hedging or len(self.latencies) < self.hedge_min_samples:
+                return await first
+            done, _ = await asyncio.wait({first}, timeout=self.latencies.quantile(self.hedge_quantile))
+            if done:
+                return first.result()
+
+            self.n_hedges += 1
+            second = asyncio.create_task(self._request(messages, kwargs))
+            tasks.append(second)
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.n_hedge_wins += task is second
+                        return task.result()
+            return first.result() # both failed, raise the error of the original
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request(self, messages: list[dict], kwargs: dict) -> ChatCompletionMessage:
+        """Single request, recording its latency if it succeeds."""
+        self.n_requests += 1
+        start = time.perf_counter()
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **kwargs,
+        )
+        self.latencies.record(time.perf_counter() - start)
+        if completion.usage:
+            _log.info(
+                f"Prompt tokens: {completion.usage.prompt_tokens}, "
+                f"completion tokens: {completion.usage.completion_tokens}"
+            )
+        return completion.choices[0].message
+
+    def stats(self) -> dict[str, float | None]:
+        """Request counters and latency quantiles."""
+        return {
+            "requests": self.n_requests,
+            "retries": self.n_retries,
+            "hedges": self.n_hedges,
+            "hedge_wins": self.n_hedge_wins,
+            "deadlines_exceeded": self.n_deadlines_exceeded,
+            "p50_seconds": self.latencies.quantile(0.5),
+            "p90_seconds": self.latencies.quantile(0.9),
+            "p99_seconds": self.latencies.quantile(0.99),
+        }
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.client.close()
+
+
+class BackgroundLoop:
+    """Event loop on a daemon thread, for running coroutines from synchronous code."""
+
+    def __init__(self):
+        """Start the loop thread."""
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """Run coroutine on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+import os
+from box import Box
+from openai import OpenAI
+
+from assistant.constants import OPENAI_API_KEY, OPENAI_ORGANIZATION
+from assistant.language_model.async_model import AsyncLanguageModel
+
+DEFAULT_BACKEND = "default"
+NO_API_KEY = "none" # local servers usually ignore the key, but the client requires one
+
+
+@dataclass
+class Backend:
+    """An OpenAI compatible API and the model to use with it."""
+
+    name: str
+    model: str
+    client: OpenAI
+    async_model: AsyncLanguageModel | None # for non streaming requests, if the async client is enabled
+    stream_usage: bool = True # the API reports token usage at the end of streams, when asked to
+
+    @property
+    def stream_kwargs(self) -> dict:
+        """Extra arguments for streaming requests."""
+        return {"stream_options": {"include_usage": True}} if self.stream_usage else {}
+
+
+def create_backend(
+    name: str,
+    model: str,
+    base_url: str | None,
+    api_key: str | None,
+    organization: str | None,
+    config: Box,
+    stream_usage: bool = True,
+) -> Backend:
+    """Create sync and, if enabled, async clients for a backend."""
+    return Backend(
+        name=name,
+        model=model,
+        client=OpenAI(api_key=api_key, organization=organization, base_url=base_url),
+        async_model=(
+            AsyncLanguageModel(
+                config,
+                model=model,
+                base_url=base_url,
+                api_key=api_key,
+                organization=organization,
+            )
+            if config.language_model.async_client.enabled
+            else None
+        ),
+        stream_usage=stream_usage,
+    )
+
+
+def create_backends(config: Box) -> dict[str, Backend]:
+    """
+    The default backend from language_model.model and base_url, with OpenAI credentials
+    from the environment, and the extra backends in language_model.backends.
+    """
+    llm_config = config.language_model
+    backends = {
+        DEFAULT_BACKEND: create_backend(
+            name=DEFAULT_BACKEND,
+            model=llm_config.model,
+            base_url=llm_config.base_url,
+            api_key=os.getenv(OPENAI_API_KEY),
+            organization=os.getenv(OPENAI_ORGANIZATION),
+            config=config,
+            stream_usage=llm_config.get("stream_usage", True),
+        )
+    }
+    for name, backend_config in (llm_config.backends or {}).items():
+        api_key_env = backend_config.get("api_key_env")
+        backends[name] = create_backend(
+            name=name,
+            model=backend_config.model,
+            base_url=backend_config.base_url,
+            api_key=(os.getenv(api_key_env) if api_key_env else None) or NO_API_KEY,
+            organization=None,
+            config=config,
+            stream_usage=backend_config.get("stream_usage", False),
+        )
+    return backends
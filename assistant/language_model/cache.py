@@ -0,0 +1,136 @@
+from collections import Counter
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from box import Box
+
+_log = logging.getLogger(__name__)
+
+HOUR = 3600
+
+
+def cache_key(model: str, messages: list[dict], template_hash: str) -> str:
+    """Hash of model, messages and template, insensitive to whitespace and case in the user message."""
+    normalized = [
+        {
+            "role": message["role"],
+            "content": (
+                " ".join(message["content"].casefold().split()).strip(" .,!?")
+                if message["role"] == "user"
+                else " ".join(message["content"].split())
+            ),
+        }
+        for message in messages
+    ]
+    payload = json.dumps([model, normalized, template_hash], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite backed cache of LLM responses that survives restarts.
+
+    Entries expire after the TTL of the tool that created them, a TTL of 0 disables
+    caching for that tool. When there are more than max_entries, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        ttls: dict[str, float],
+        default_ttl: float,
+    ):
+        """Open or create the cache database. TTLs are in seconds."""
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used_at ON responses (last_used_at)"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: Box) -> "ResponseCache":
+        """Create cache from the language_model.cache config."""
+        cache_config = config.language_model.cache
+        return cls(
+            path=cache_config.path,
+            max_entries=cache_config.max_entries,
+            ttls={tool: hours * HOUR for tool, hours in cache_config.ttl_hours.items()},
+            default_ttl=cache_config.default_ttl_hours * HOUR,
+        )
+
+    def ttl(self, tool: str) -> float:
+        """TTL in seconds for a tool, falling back on the prompt name and then the default."""
+        prompt_name = tool.split(".")[0]
+        return self.ttls.get(tool, self.ttls.get(prompt_name, self.default_ttl))
+
+    def get(self, key: str, tool: str) -> str | None:
+        """Return the cached response if it has not expired."""
+        ttl = self.ttl(tool)
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - ttl),
+            ).fetchone()
+            if row is None:
+                self.misses[tool] += 1
+                return None
+            self._connection.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits[tool] += 1
+        _log.info(f"Cache hit for {tool}.")
+        return row[0]
+
+    def put(self, key: str, tool: str, response: str) -> None:
+        """Store a response and evict the least recently used entries above max_entries."""
+        if self.ttl(tool) <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, tool, response, now, now),
+            )
+            self._connection.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hit and miss counts per tool."""
+        return {
+            tool: {"hits": self.hits[tool], "misses": self.misses[tool]}
+            for tool in sorted(self.hits.keys() | self.misses.keys())
+        }
@@ -0,0 +1,163 @@
+from collections import Counter
+from dataclasses import dataclass
+import logging
+import threading
+import time
+from typing import Any, Callable
+from box import Box
+import requests
+
+from assistant.metrics import REGISTRY, timed
+
+_log = logging.getLogger(__name__)
+
+MINUTE = 60
+
+
+@dataclass
+class Forecast:
+    """Parsed forecast for a point, with what is needed to revalidate it."""
+
+    data: Any
+    approved_time: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class ForecastCache:
+    """
+    In-memory cache of parsed SMHI point forecasts, keyed by latitude and longitude.
+
+    Forecasts younger than fresh_seconds are served as is. Older ones, up to
+    max_stale_seconds, are served immediately while a conditional request revalidates
+    them on a background thread. Forecasts older than that are fetched before
+    answering, but if SMHI is slow or down the stale forecast is served anyway.
+    A forecast is only parsed again when its approvedTime has changed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        parse: Callable[[dict], Any],
+        fresh_seconds: float,
+        max_stale_seconds: float,
+        timeout_seconds: float,
+    ):
+        """Create cache for forecasts at url, formatted with lat and lon, parsed by parse."""
+        self.url = url
+        self.parse = parse
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.timeout_seconds = timeout_seconds
+        self.outcomes: Counter[str] = Counter() # of get: hit, stale, miss or stale_on_error
+        self.fetches: Counter[str] = Counter() # of requests to SMHI: not_modified or updated
+        self._forecasts: dict[tuple[float, float], Forecast] = {}
+        self._revalidating: set[tuple[float, float]] = set()
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    @classmethod
+    def from_config(cls, config: Box, parse: Callable[[dict], Any]) -> "ForecastCache":
+        """Create cache from the weather config."""
+        weather_config = config.weather
+        return cls(
+            url=weather_config.url,
+            parse=parse,
+            fresh_seconds=weather_config.cache.fresh_minutes * MINUTE,
+            max_stale_seconds=weather_config.cache.max_stale_minutes * MINUTE,
+            timeout_seconds=weather_config.cache.timeout_seconds,
+        )
+
+    def get(self, lat: float, lon: float) -> Any:
+        """Parsed forecast for a point."""
+        key = (lat, lon)
+        start = time.perf_counter()
+        with self._lock:
+            forecast = self._forecasts.get(key)
+            age = time.time() - forecast.fetched_at if forecast else None
+            revalidate = (
+                forecast is not None
+                and self.fresh_seconds <= age < self.max_stale_seconds
+                and key not in self._revalidating
+            )
+            if revalidate:
+                self._revalidating.add(key)
+
+        if forecast is not None and age < self.fresh_seconds:
+            outcome = "hit"
+        elif forecast is not None and age < self.max_stale_seconds:
+            outcome = "stale"
+            if revalidate:
+                threading.Thread(target=self._revalidate, args=(key,), daemon=True).start()
+        else:
+            try:
+                forecast = self._fetch(key, forecast)
+                outcome = "miss"
+            except requests.RequestException as e:
+                if forecast is None:
+                    raise
+                _log.warning(f"Serving forecast from {age / MINUTE:.0f} minutes ago, SMHI failed: {e}")
+                outcome = "stale_on_error"
+
+        self.outcomes[outcome] += 1
+        REGISTRY.observe("forecast_cache", time.perf_counter() - start, outcome)
+        return forecast.data
+
+    def _revalidate(self, key: tuple[float, float]) -> None:
+        """Refresh a forecast in the background."""
+        try:
+            self._fetch(key, self._forecasts[key])
+        except requests.RequestException as e:
+            _log.warning(f"Failed to revalidate forecast: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def _fetch(self, key: tuple[float, float], cached: Forecast | None) -> Forecast:
+        """Conditional request for a forecast, parsed again only if SMHI has a new one."""
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        lat, lon = key
+        with timed("smhi_fetch"):
+            response = self._session.get(
+                self.url.format(lat=lat, lon=lon),
+                headers=headers,
+                timeout=self.timeout_seconds,
+            )
+            response.raise_for_status()
+            body = None if response.status_code == 304 else response.json()
+
+        if cached is not None and (body is None or body["approvedTime"] == cached.approved_time):
+            self.fetches["not_modified"] += 1
+            forecast = Forecast(
+                data=cached.data,
+                approved_time=cached.approved_time,
+                etag=response.headers.get("ETag", cached.etag),
+                last_modified=response.headers.get("Last-Modified", cached.last_modified),
+                fetched_at=time.time(),
+            )
+        else:
+            self.fetches["updated"] += 1
+            forecast = Forecast(
+                data=self.parse(body),
+                approved_time=body["approvedTime"],
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                fetched_at=time.time(),
+            )
+        with self._lock:
+            self._forecasts[key] = forecast
+        return forecast
+
+    def stats(self) -> dict[str, Any]:
+        """Outcome counts and the share of forecasts served without waiting for SMHI."""
+        total = self.outcomes.total()
+        return {
+            "outcomes": dict(self.outcomes),
+            "fetches": dict(self.fetches),
+            "hit_ratio": (total - self.outcomes["miss"]) / total if total else 0.0,
+        }
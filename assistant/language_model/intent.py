@@ -0,0 +1,134 @@
+import csv
+import re
+from box import Box
+import numpy as np
+
+from assistant.language_model.action import Action
+
+_NON_WORD = re.compile(r"[^\w\s]")
+# Utterances with these words may ask for several actions, which only the LLM can split up.
+# Many single commands have them too ("spela Simon och Garfunkel"), see is_compound.
+CONJUNCTIONS = {"och", "sen", "sedan", "and", "then"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase text without punctuation and repeated whitespace."""
+    return " ".join(_NON_WORD.sub("", text.lower()).split())
+
+
+def char_ngrams(text: str, ngram_min: int, ngram_max: int) -> list[str]:
+    """Character n-grams of the normalized text, padded so word boundaries are included."""
+    text = f" {normalize(text)} "
+    return [
+        text[i:i + n]
+        for n in range(ngram_min, ngram_max + 1)
+        for i in range(len(text) - n + 1)
+    ]
+
+
+def load_labeled_file(path: str) -> list[tuple[Action, str]]:
+    """Read a tab separated file with an action name and a sentence on every row."""
+    with open(path, "r") as file:
+        return [
+            (Action[row["action"].strip().upper()], row["sentence"])
+            for row in csv.DictReader(file, delimiter="\t")
+        ]
+
+
+class IntentClassifier:
+    """
+    Character n-gram TF-IDF classifier mapping utterances to actions, without the LLM.
+
+    Every action is represented by the normalized centroid of its training sentences.
+    An utterance is scored by cosine similarity against all centroids, which only
+    touches the vocabulary columns of the n-grams it contains. The confidence is the
+    margin between the best and second best action, predictions below threshold are
+    left to the LLM.
+    """
+
+    def __init__(
+        self,
+        examples: list[tuple[Action, str]],
+        threshold: float,
+        ngram_min: int = 2,
+        ngram_max: int = 4,
+    ):
+        """Fit vocabulary, idf weights and action centroids on the examples."""
+        self.threshold = threshold
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.vocabulary: dict[str, int] = {}
+        documents = []
+        for _, sentence in examples:
+            ngrams = char_ngrams(sentence, ngram_min, ngram_max)
+            documents.append([self.vocabulary.setdefault(ngram, len(self.vocabulary)) for ngram in ngrams])
+
+        counts = np.zeros((len(examples), len(self.vocabulary)), dtype=np.float32)
+        for row, indices in enumerate(documents):
+            np.add.at(counts[row], indices, 1)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(examples)) / (1 + document_frequency)) + 1).astype(np.float32)
+        tfidf = self._normalize_rows(np.log1p(counts) * self.idf)
+
+        self.actions = sorted({action for action, _ in examples}, key=lambda action: action.value)
+        labels = np.array([self.actions.index(action) for action, _ in examples])
+        centroids = np.stack([tfidf[labels == i].mean(axis=0) for i in range(len(self.actions))])
+        # Stored column major, so the columns of an utterance's n-grams are gathered quickly.
+        self.centroids = np.asfortranarray(self._normalize_rows(centroids))
+
+    @classmethod
+    def from_config(cls, config: Box) -> "IntentClassifier":
+        """Train classifier on the configured labeled file."""
+        classifier_config = config.language_model.intent_classifier
+        return cls(
+            examples=load_labeled_file(classifier_config.training_file),
+            threshold=classifier_config.threshold,
+            ngram_min=classifier_config.ngram_min,
+            ngram_max=classifier_config.ngram_max,
+        )
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length."""
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-10)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of the text to every action in self.actions."""
+        indices = [
+            self.vocabulary[ngram]
+            for ngram in char_ngrams(text, self.ngram_min, self.ngram_max)
+            if ngram in self.vocabulary
+        ]
+        if not indices:
+            return np.zeros(len(self.actions), dtype=np.float32)
+        indices, counts = np.unique(indices, return_counts=True)
+        weights = np.log1p(counts.astype(np.float32)) * self.idf[indices]
+        weights /= np.linalg.norm(weights)
+        return self.centroids[:, indices] @ weights
+
+    def predict(self, text: str) -> tuple[Action, float]:
+        """Return the most similar action and the confidence in it."""
+        scores = self.scores(text)
+        if len(scores) == 1: # nothing to confuse it with, the runner-up scores 0
+            return self.actions[0], float(scores[0])
+        runner_up, best = np.argsort(scores)[-2:]
+        return self.actions[best], float(scores[best] - scores[runner_up])
+
+    def is_compound(self, text: str) -> bool:
+        """Check if text joins commands for different actions, i.e. both sides of a conjunction are confident."""
+        words = normalize(text).split()
+        for i, word in enumerate(words):
+            if word not in CONJUNCTIONS or i == 0 or i == len(words) - 1:
+                continue
+            left, left_confidence = self.predict(" ".join(words[:i]))
+            right, right_confidence = self.predict(" ".join(words[i + 1:]))
+            if left != right and min(left_confidence, right_confidence) >= self.threshold:
+                return True
+        return False
+
+    def route(self, text: str) -> Action | None:
+        """Return the action if the classifier is confident enough and it is a single command, else None."""
+        if self.is_compound(text):
+            return None
+        action, confidence = self.predict(text)
+        return action if confidence >= self.threshold else None
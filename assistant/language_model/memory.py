@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+import logging
+import threading
+import time
+from typing import Callable
+from box import Box
+
+_log = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4 # rough average for gpt tokenizers, good enough for budgeting
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class Turn:
+    """One user utterance and the assistant's response to it."""
+
+    user: str
+    assistant: str
+
+    @property
+    def tokens(self) -> int:
+        return count_tokens(self.user) + count_tokens(self.assistant)
+
+
+class ConversationMemory:
+    """
+    Multi-turn memory with a bounded number of prompt tokens.
+
+    Recent turns are kept verbatim within max_tokens. When the window is full, the
+    oldest turns are folded into a running summary of at most summary_max_tokens,
+    so the prompt size stays flat however long the conversation runs. Summarizing
+    runs on a background thread, until it is done the folded turns are still used
+    verbatim. The whole session is forgotten after expiry_seconds without activity.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        summary_max_tokens: int,
+        expiry_seconds: float,
+        summarize: Callable[[str, list[Turn], int], str],
+    ):
+        """summarize(summary, turns, max_tokens) returns a new summary including the turns."""
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.expiry_seconds = expiry_seconds
+        self.summarize = summarize
+        self._lock = threading.Lock()
+        self._session = 0 # incremented on reset, so summaries of a forgotten session are dropped
+        self._summarizing = False
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: Box, summarize: Callable[[str, list[Turn], int], str]) -> "ConversationMemory":
+        """Create memory from the language_model.memory config."""
+        memory_config = config.language_model.memory
+        return cls(
+            max_tokens=memory_config.max_tokens,
+            summary_max_tokens=memory_config.summary_max_tokens,
+            expiry_seconds=memory_config.expiry_minutes * 60,
+            summarize=summarize,
+        )
+
+    def reset(self) -> None:
+        """Start a new session."""
+        self.summary = ""
+        self.turns: list[Turn] = []
+        self.folding: list[Turn] = [] # turns out of the window, waiting to be summarized
+        self.last_activity = time.monotonic()
+        self._session += 1
+
+    def _expire(self) -> None:
+        """Forget the session if it has been inactive for too long."""
+        if (self.turns or self.folding) and time.monotonic() - self.last_activity > self.expiry_seconds:
+            _log.info("Conversation expired, starting a new session.")
+            self.reset()
+
+    def messages(self) -> list[dict]:
+        """Summary and recent turns as chat messages, to put between the system and user message."""
+        with self._lock:
+            self._expire()
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"Summary of the conversation so far: {self.summary}"})
+            for turn in self.folding + self.turns:
+                messages += [
+                    {"role": "user", "content": turn.user},
+                    {"role": "assistant", "content": turn.assistant},
+                ]
+            return messages
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens that messages() adds to a prompt."""
+        return count_tokens(self.summary) + sum(turn.tokens for turn in self.folding + self.turns)
+
+    def add_turn(self, user: str | None, assistant: str | None) -> None:
+        """Remember a turn, folding the oldest turns into the summary in the background if over budget."""
+        user, assistant = user or "", assistant or "" # a tool call answer has no content
+        # A single turn can not be larger than the window.
+        max_chars = (self.max_tokens // 2 - 1) * CHARS_PER_TOKEN
+        with self._lock:
+            self._expire()
+            self.turns.append(Turn(user=user[:max_chars], assistant=assistant[:max_chars]))
+            self.last_activity = time.monotonic()
+            while len(self.turns) > 1 and sum(turn.tokens for turn in self.turns) > self.max_tokens:
+                self.folding.append(self.turns.pop(0))
+            start = bool(self.folding) and not self._summarizing
+            self._summarizing = self._summarizing or start
+        if start:
+            threading.Thread(target=self._fold, daemon=True).start()
+
+    def _fold(self) -> None:
+        """Summarize folded turns until there are none left, without holding the lock while summarizing."""
+        while True:
+            with self._lock:
+                if not self.folding:
+                    self._summarizing = False
+                    return
+                session, summary, folded = self._session, self.summary, list(self.folding)
+            try:
+                summary = self.summarize(summary, folded, self.summary_max_tokens)
+            except Exception:
+                _log.exception(f"Failed to summarize {len(folded)} turns, they are forgotten.")
+            with self._lock:
+                if session != self._session:
+                    continue
+                # Hard limit in case the model ignores the requested length.
+                self.summary = summary[:self.summary_max_tokens * CHARS_PER_TOKEN]
+                del self.folding[:len(folded)]
+                _log.info(f"Folded {len(folded)} turns into the summary, memory is ~{self.tokens} tokens.")
@@ -1,29 +1,65 @@
 from box import Box
-from openai import OpenAI
+from collections import Counter
+import json
+from typing import Iterator
 from openai.types.chat import ChatCompletionMessage
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk, ChoiceDelta
+from openai.types.completion_usage import CompletionUsage
 
-from assistant.constants import OPENAI_API_KEY, OPENAI_ORGANIZATION
-import os
+from assistant.language_model.async_model import BackgroundLoop
+from assistant.language_model.backends import DEFAULT_BACKEND, Backend, create_backends
+from assistant.language_model.cache import ResponseCache, cache_key
+from assistant.language_model.memory import ConversationMemory, Turn
+from assistant.language_model.structured import parse_json
+from assistant.language_model.utils import render_prompt, template_hash
+from assistant.metrics import REGISTRY, timed, timed_iterator
+import logging
+import threading
+import time
+
+_log = logging.getLogger(__name__)
+SUMMARY_PROMPT = "summarize_conversation"
 
 class LanguageModel:
     def __init__(self, config: Box):
         """Initialize LLM."""
-        self.client = OpenAI(
-            api_key=os.getenv(OPENAI_API_KEY),
-            organization=os.getenv(OPENAI_ORGANIZATION),
+        self.backends = create_backends(config)
+        self.tool_backends = config.language_model.tool_backends or {}
+        self.memory = (
+            ConversationMemory.from_config(config, summarize=self._summarize)
+            if config.language_model.memory.enabled
+            else None
         )
-        self.history: list[dict] = [] # Not used yet :)
         self.extra_instructions = config.language_model.extra_instructions
-        self.model = config.language_model.model
+        self.n_requests = 0 # round trips to the API, for benchmarking
+        self.cache = (
+            ResponseCache.from_config(config)
+            if config.language_model.cache.enabled
+            else None
+        )
+        self.response_format = config.language_model.structured_output.response_format
+        self.json_retries = config.language_model.structured_output.max_retries
+        self.json_outcomes: Counter[tuple[str, str]] = Counter()
+        self._json_outcomes_lock = threading.Lock() # answer_json runs on the action pool threads
+        # Non streaming requests go through the async client, for its deadlines, retries and hedging.
+        if config.language_model.async_client.enabled:
+            self._loop = BackgroundLoop()
+
+    def backend(self, tool: str | None) -> Backend:
+        """Backend configured for a tool (or its prompt name), the default backend otherwise."""
+        name = DEFAULT_BACKEND
+        if tool:
+            name = self.tool_backends.get(tool, self.tool_backends.get(tool.split(".")[0], DEFAULT_BACKEND))
+        return self.backends[name]
     
-    def answer_prompt(
+    def _messages(
         self,
         system_prompt: str | None,
         user_prompt: str,
-        use_extra_instructions: bool = True,
-    ) -> ChatCompletionMessage:
-        """Answer prompt."""
-
+        use_extra_instructions: bool,
+        use_memory: bool = False,
+    ) -> list[dict]:
+        """System and user message, with default system prompt, extra instructions and memory."""
         system_prompt = (
             system_prompt 
             if system_prompt
@@ -31,14 +67,238 @@ class LanguageModel:
         )
         if use_extra_instructions:
             system_prompt += " " + self.extra_instructions
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt,
-                },
-                {"role": "user", "content": user_prompt},
-            ],
+        memory = self.memory.messages() if use_memory and self.memory else []
+        return [
+            {
+                "role": "system",
+                "content": system_prompt,
+            },
+            *memory,
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def _summarize(self, summary: str, turns: list[Turn], max_tokens: int) -> str:
+        """Fold turns into the conversation summary."""
+        system_prompt = render_prompt(
+            prompt_name=SUMMARY_PROMPT,
+            summary=summary or "(empty)",
+            turns=turns,
+            max_words=max_tokens * 3 // 4,
+        )
+        return self.answer_prompt(
+            system_prompt=system_prompt,
+            user_prompt="Update the summary.",
+        ).content
+
+    def _cache_key(self, messages: list[dict], tool: str | None) -> str | None:
+        """Cache key for the messages, None if they should not be cached."""
+        if not self.cache or not tool:
+            return None
+        prompt_name, _, prompt_key = tool.partition(".")
+        return cache_key(self.backend(tool).model, messages, template_hash(prompt_name, prompt_key or "prompt"))
+
+    def answer_prompt(
+        self,
+        system_prompt: str | None,
+        user_prompt: str,
+        use_extra_instructions: bool = True,
+        tool: str | None = None,
+        use_memory: bool = False,
+    ) -> ChatCompletionMessage:
+        """
+        Answer prompt.
+
+        Responses are cached if tool is given. It names the prompt template used, as
+        prompt_name or prompt_name.prompt_key, and selects the TTL of the entry.
+        With use_memory, earlier turns of the conversation are included.
+        """
+        messages = self._messages(system_prompt, user_prompt, use_extra_instructions, use_memory)
+        key = self._cache_key(messages, tool)
+        if key:
+            cached = self.cache.get(key, tool)
+            if cached is not None:
+                return ChatCompletionMessage.model_validate_json(cached)
+
+        message = self._complete(messages, tool=tool)
+        if key:
+            self.cache.put(key, tool, message.model_dump_json())
+        return message
+
+    def answer_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: dict,
+        tool: str,
+        use_memory: bool = False,
+    ) -> dict | None:
+        """
+        Answer prompt with a JSON object matching schema, None if the model fails to produce one.
+
+        The API's JSON mode is used if configured. Answers that are almost valid JSON are
+        repaired locally, otherwise the model is asked again with the error, up to
+        json_retries times. Only valid answers are cached.
+        """
+        messages = self._messages(system_prompt, user_prompt, use_extra_instructions=True, use_memory=use_memory)
+        key = self._cache_key(messages, tool)
+        if key:
+            cached = self.cache.get(key, tool)
+            if cached is not None:
+                return json.loads(ChatCompletionMessage.model_validate_json(cached).content)
+
+        for attempt in range(self.json_retries + 1):
+            answer = self._complete(messages, tool=tool, **self._response_format(schema, tool)).content
+            value, repaired, error = parse_json(answer or "", schema)
+            if value is not None:
+                break
+            _log.warning(f"Invalid JSON from {tool}: {error}")
+            messages = [
+                *messages,
+                {"role": "assistant", "content": answer or ""},
+                {"role": "user", "content": f"That answer was invalid: {error}. Answer with valid JSON only."},
+            ]
+        else:
+            with self._json_outcomes_lock:
+                self.json_outcomes[tool, "failed"] += 1
+            return None
+
+        with self._json_outcomes_lock:
+            self.json_outcomes[tool, "retried" if attempt else "repaired" if repaired else "valid"] += 1
+        if key:
+            message = ChatCompletionMessage(role="assistant", content=json.dumps(value, ensure_ascii=False))
+            self.cache.put(key, tool, message.model_dump_json())
+        return value
+
+    def _response_format(self, schema: dict, tool: str) -> dict:
+        """Request arguments for the configured JSON mode."""
+        match self.response_format:
+            case "json_schema":
+                return {
+                    "response_format": {
+                        "type": "json_schema",
+                        "json_schema": {"name": tool.replace(".", "_"), "schema": schema},
+                    }
+                }
+            case "json_object":
+                return {"response_format": {"type": "json_object"}}
+            case _:
+                return {}
+
+    def json_stats(self) -> dict[str, dict[str, int]]:
+        """
+        JSON answer outcomes per tool.
+
+        Repaired and retried answers used to fail, making the user repeat the command.
+        Every repaired answer saves a full speech to text and LLM round trip, a retried
+        one trades it for a single extra request.
+        """
+        stats = {}
+        with self._json_outcomes_lock:
+            outcomes = sorted(self.json_outcomes.items())
+        for (tool, outcome), count in outcomes:
+            stats.setdefault(tool, {})[outcome] = count
+        return stats
+
+    def stream_prompt(
+        self,
+        system_prompt: str | None,
+        user_prompt: str,
+        use_extra_instructions: bool = True,
+        tool: str | None = None,
+        use_memory: bool = False,
+    ) -> Iterator[str]:
+        """Like answer_prompt, but yield the answer token by token as it is generated."""
+        messages = self._messages(system_prompt, user_prompt, use_extra_instructions, use_memory)
+        key = self._cache_key(messages, tool)
+        if key:
+            cached = self.cache.get(key, tool)
+            if cached is not None:
+                yield ChatCompletionMessage.model_validate_json(cached).content
+                return
+
+        self.n_requests += 1
+        backend = self.backend(tool)
+        tokens = []
+        start = time.perf_counter()
+        for chunk in timed_iterator("llm", self._stream(backend, messages=messages), tool or ""):
+            self._log_usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not tokens:
+                    REGISTRY.observe("llm_first_token", time.perf_counter() - start, tool or "")
+                tokens.append(chunk.choices[0].delta.content)
+                yield tokens[-1]
+        if key:
+            message = ChatCompletionMessage(role="assistant", content="".join(tokens))
+            self.cache.put(key, tool, message.model_dump_json())
+
+    def call_tools(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        tools: list[dict],
+        use_memory: bool = False,
+        tool: str | None = None,
+    ) -> ChatCompletionMessage:
+        """Let the model pick one of the tools and its arguments, or answer directly. Never cached."""
+        return self._complete(
+            self._messages(system_prompt, user_prompt, use_extra_instructions=True, use_memory=use_memory),
+            tool=tool,
+            tools=[{"type": "function", "function": schema} for schema in tools],
+            tool_choice="auto",
+        )
+
+    def _complete(self, messages: list[dict], tool: str | None = None, **kwargs) -> ChatCompletionMessage:
+        """Request a completion from the tool's backend, through its async client if it is enabled."""
+        self.n_requests += 1
+        backend = self.backend(tool)
+        with timed("llm", tool or ""):
+            if backend.async_model:
+                return self._loop.run(backend.async_model.complete(messages, **kwargs))
+            completion = backend.client.chat.completions.create(
+                model=backend.model,
+                messages=messages,
+                **kwargs,
+            )
+        self._log_usage(completion.usage)
+        return completion.choices[0].message
+
+    def _log_usage(self, usage: CompletionUsage | None) -> None:
+        """Log prompt tokens of a request, to keep an eye on the cost."""
+        if usage:
+            _log.info(f"Prompt tokens: {usage.prompt_tokens}, completion tokens: {usage.completion_tokens}")
+
+    def stream_tools(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        tools: list[dict],
+        use_memory: bool = False,
+        tool: str | None = None,
+    ) -> Iterator[ChoiceDelta]:
+        """Like call_tools, but yield the deltas of the response as they are generated."""
+        self.n_requests += 1
+        backend = self.backend(tool)
+        first = True
+        start = time.perf_counter()
+        stream = self._stream(
+            backend,
+            messages=self._messages(system_prompt, user_prompt, use_extra_instructions=True, use_memory=use_memory),
+            tools=[{"type": "function", "function": schema} for schema in tools],
+            tool_choice="auto",
+        )
+        for chunk in timed_iterator("llm", stream, tool or ""):
+            self._log_usage(chunk.usage)
+            if chunk.choices:
+                if first:
+                    REGISTRY.observe("llm_first_token", time.perf_counter() - start, tool or "")
+                    first = False
+                yield chunk.choices[0].delta
+
+    def _stream(self, backend: Backend, **kwargs) -> Iterator[ChatCompletionChunk]:
+        """Streamed completion from a backend, the request is sent when the first chunk is asked for."""
+        yield from backend.client.chat.completions.create(
+            model=backend.model,
+            stream=True,
+            **backend.stream_kwargs,
+            **kwargs,
         )
-        return completion.choices[0].message
\ No newline at end of file
@@ -0,0 +1,102 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import time
+from box import Box
+
+from assistant.language_model.action import Action
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.tools import select_action
+from assistant.utils import WakeWordMatcher
+
+_log = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """Lowercase text without punctuation, for comparing hypotheses."""
+    return " ".join("".join(c for c in text.lower() if c.isalnum() or c.isspace()).split())
+
+
+class SpeculativeRouter:
+    """
+    Starts action selection on partial transcripts, before the utterance is finished.
+
+    Once the same wake word prefixed hypothesis has been seen stable_partials times in
+    a row, select_action is run in the background. When the final transcript arrives
+    the speculative result is reused if the text matches, otherwise it is discarded
+    and selection runs again on the final text.
+    """
+
+    def __init__(self, llm: LanguageModel, config: Box):
+        """Initialize router."""
+        self.llm = llm
+        self.config = config
+        self.stable_partials = config.speech_to_text.speculation.stable_partials
+        self.wake_word_matcher = WakeWordMatcher.from_config(config)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._reset()
+
+        self.n_speculations = 0
+        self.n_hits = 0
+        self.n_misses = 0
+        self.seconds_saved = 0.0
+
+    def _reset(self) -> None:
+        """Forget the current utterance."""
+        self._last_partial = None
+        self._n_stable = 0
+        self._speculated_text = None
+        self._future: Future | None = None
+        self._started_at = 0.0
+
+    def on_partial(self, text: str) -> None:
+        """Handle a partial hypothesis from the transcriber."""
+        if not self.wake_word_matcher.matches(text):
+            return
+        key = normalize(text)
+        with self._lock:
+            self._n_stable = self._n_stable + 1 if key == self._last_partial else 1
+            self._last_partial = key
+            if self._n_stable < self.stable_partials or key == self._speculated_text:
+                return
+            _log.info(f"Speculatively selecting action for '{text}'.")
+            self.n_speculations += 1
+            self._speculated_text = key
+            self._started_at = time.monotonic()
+            self._future = self._executor.submit(self._timed_select_action, text)
+
+    def _timed_select_action(self, query: str) -> tuple[tuple[list[tuple[Action, str]], str], float]:
+        """Run select_action, also returning when it finished."""
+        result = select_action.main(query=query, llm=self.llm, config=self.config)
+        return result, time.monotonic()
+
+    def select_action(self, transcription: str) -> tuple[list[tuple[Action, str]], str]:
+        """Select action for the final transcription, reusing the speculative result when it matches."""
+        with self._lock:
+            future, speculated_text, started_at = self._future, self._speculated_text, self._started_at
+            self._reset()
+
+        if future is not None and normalize(transcription) == speculated_text:
+            final_at = time.monotonic()
+            result, finished_at = future.result()
+            # Without speculation selection would have started at final_at, so the time saved
+            # is however long it had already been running by then.
+            saved = min(finished_at, final_at) - started_at
+            self.n_hits += 1
+            self.seconds_saved += saved
+            self._log_stats()
+            return result
+
+        if future is not None:
+            future.cancel()
+            self.n_misses += 1
+            self._log_stats()
+        return select_action.main(query=transcription, llm=self.llm, config=self.config)
+
+    def _log_stats(self) -> None:
+        """Log how often speculation was right and the latency it saved."""
+        _log.info(
+            f"Speculation: {self.n_hits} hits, {self.n_misses} misses of {self.n_speculations} "
+            f"speculations, {self.seconds_saved:.2f} s saved in total."
+        )
@@ -0,0 +1,123 @@
+import json
+import re
+from typing import Any
+
+_CODE_FENCE = re.compile(r"^```[a-z]*\s*|\s*```$")
+_STRING = re.compile(r'("(?:\\.|[^"\\])*")')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# Whitespace with a line break at the end of the text between two strings, after a value.
+_LINE_BREAK_AFTER_VALUE = re.compile(r"(^|[\d}\]]|true|false|null)(\s*\n\s*)$")
+_PYTHON_LITERALS = re.compile(r"\b(True|False|None)\b")
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+}
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the mistakes models make when writing JSON by hand.
+
+    Removes code fences and text around the object, trailing commas and Python
+    literals, and adds commas missing between lines. Only text outside of strings
+    is changed.
+    """
+    text = _CODE_FENCE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    # Strings are at the odd indices, the text between them at the even ones.
+    parts = _STRING.split(text)
+    for i in range(0, len(parts), 2):
+        part = _TRAILING_COMMA.sub(r"\1", parts[i])
+        part = _PYTHON_LITERALS.sub(lambda match: _JSON_LITERALS[match.group(1)], part)
+        if i < len(parts) - 1:
+            # A line break before the next string, after a value here or the previous string.
+            after_value = _LINE_BREAK_AFTER_VALUE.search(part)
+            if after_value and (after_value.group(1) or i > 0):
+                part = part[:after_value.start(2)] + "," + part[after_value.start(2):]
+        parts[i] = part
+    return "".join(parts)
+
+
+def coerce_numbers(value: Any, schema: dict) -> Any:
+    """Convert numeric strings to numbers where the schema expects an integer or number, e.g. "action": "2"."""
+    expected = schema.get("type")
+    if isinstance(value, str) and expected in ("integer", "number"):
+        try:
+            return int(value) if expected == "integer" else float(value)
+        except ValueError:
+            return value
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        return {
+            key: coerce_numbers(item, properties[key]) if key in properties else item
+            for key, item in value.items()
+        }
+    if isinstance(value, list) and "items" in schema:
+        return [coerce_numbers(item, schema["items"]) for item in value]
+    return value
+
+
+def validate(value: Any, schema: dict, path: str = "$") -> str | None:
+    """
+    Check value against the subset of JSON schema used by the tools, return the first error.
+
+    Supports type, properties, required, items, enum, minimum and maximum.
+    """
+    expected = schema.get("type")
+    if expected:
+        # bool is an int in Python, but not a number in JSON
+        if not isinstance(value, _TYPES[expected]) or (isinstance(value, bool) and expected != "boolean"):
+            return f"{path} should be of type {expected}"
+    if "enum" in schema and value not in schema["enum"]:
+        return f"{path} should be one of {schema['enum']}"
+    if "minimum" in schema and value < schema["minimum"]:
+        return f"{path} should be at least {schema['minimum']}"
+    if "maximum" in schema and value > schema["maximum"]:
+        return f"{path} should be at most {schema['maximum']}"
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                return f"{path}.{key} is missing"
+        for key, property_schema in schema.get("properties", {}).items():
+            if key in value:
+                error = validate(value[key], property_schema, f"{path}.{key}")
+                if error:
+                    return error
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            error = validate(item, schema["items"], f"{path}[{i}]")
+            if error:
+                return error
+    return None
+
+
+def parse_json(text: str, schema: dict) -> tuple[dict | None, bool, str | None]:
+    """
+    Parse and validate a JSON answer, repairing it if it is not valid as is. Repairing
+    also turns numeric strings into numbers where the schema expects them.
+
+    Returns the parsed object (None if it could not be used), whether it had to be
+    repaired, and the error that made it unusable.
+    """
+    try:
+        value = json.loads(text)
+        error = validate(value, schema)
+        if error is None:
+            return value, False, None
+    except json.JSONDecodeError as e:
+        error = str(e)
+    try:
+        value = coerce_numbers(json.loads(repair_json(text)), schema)
+    except json.JSONDecodeError:
+        return None, False, error
+    repaired_error = validate(value, schema)
+    if repaired_error:
+        return None, False, repaired_error
+    return value, True, None
@@ -1,4 +1,4 @@
-
+from typing import Iterator
 from assistant.language_model.model import LanguageModel
 from assistant.language_model.utils import render_prompt
 from box import Box
@@ -8,6 +8,7 @@ NAME = "answer_question"
 def main(
     query: str, 
     llm: LanguageModel,
+    config: Box | None = None,
 ) -> str:
     """Answer random user question using LLM."""
     system_prompt = render_prompt(
@@ -16,6 +17,24 @@ def main(
     answer = llm.answer_prompt(
         system_prompt=system_prompt,
         user_prompt=query,
+        tool=NAME,
+        use_memory=True,
     ).content
     
-    return answer
\ No newline at end of file
+    return answer
+
+
+def stream(
+    query: str,
+    llm: LanguageModel,
+) -> Iterator[str]:
+    """Answer random user question using LLM, yielding tokens as they are generated."""
+    system_prompt = render_prompt(
+        prompt_name=NAME,
+    )
+    return llm.stream_prompt(
+        system_prompt=system_prompt,
+        user_prompt=query,
+        tool=NAME,
+        use_memory=True,
+    )
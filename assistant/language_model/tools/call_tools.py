@@ -0,0 +1,119 @@
+import datetime
+import json
+from functools import partial
+import logging
+from typing import Iterator
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.utils import render_prompt
+from assistant.language_model.action import run_concurrently, run_tool_call, tool_schemas
+from box import Box
+
+_log = logging.getLogger(__name__)
+NAME = "call_tools"
+
+def main(
+    query: str,
+    llm: LanguageModel,
+    config: Box,
+) -> str:
+    """
+    Select actions and their arguments in a single request, then run them concurrently.
+
+    Replaces select_action followed by the tool's own prompt. Only tools that need
+    to look at fetched data, like get_weather, make another request.
+    """
+    system_prompt = render_prompt(
+        prompt_name=NAME,
+        current_datetime=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    message = llm.call_tools(
+        system_prompt=system_prompt,
+        user_prompt=query,
+        tools=tool_schemas(config),
+        use_memory=True,
+        tool=NAME,
+    )
+    if not message.tool_calls:
+        return message.content or ""
+
+    return run_all(
+        [(tool_call.function.name, tool_call.function.arguments) for tool_call in message.tool_calls],
+        query=query,
+        llm=llm,
+        config=config,
+    )
+
+
+def stream(
+    query: str,
+    llm: LanguageModel,
+    config: Box,
+) -> Iterator[str]:
+    """
+    Like main, but yield direct answers token by token as they are generated.
+
+    Tool calls can only be run once all of their arguments have arrived, their
+    merged response is yielded as a whole.
+    """
+    system_prompt = render_prompt(
+        prompt_name=NAME,
+        current_datetime=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    names: dict[int, str] = {}
+    arguments: dict[int, str] = {}
+    for delta in llm.stream_tools(
+        system_prompt=system_prompt,
+        user_prompt=query,
+        tools=tool_schemas(config),
+        use_memory=True,
+        tool=NAME,
+    ):
+        if delta.content:
+            yield delta.content
+        for tool_call in delta.tool_calls or []:
+            if tool_call.function:
+                names[tool_call.index] = names.get(tool_call.index, "") + (tool_call.function.name or "")
+                arguments[tool_call.index] = arguments.get(tool_call.index, "") + (tool_call.function.arguments or "")
+    if names:
+        yield run_all(
+            [(names[index], arguments[index]) for index in sorted(names)],
+            query=query,
+            llm=llm,
+            config=config,
+        )
+
+
+def run_all(
+    tool_calls: list[tuple[str, str]],
+    query: str,
+    llm: LanguageModel,
+    config: Box,
+) -> str:
+    """Run tool calls, given as names and JSON arguments, concurrently and merge their responses."""
+    return run_concurrently(
+        [partial(run, name=name, arguments=arguments, query=query, llm=llm, config=config) for name, arguments in tool_calls],
+        config=config,
+    )
+
+
+def run(
+    name: str,
+    arguments: str,
+    query: str,
+    llm: LanguageModel,
+    config: Box,
+) -> str:
+    """Parse the JSON arguments of a tool call and run the tool."""
+    try:
+        parsed_arguments = json.loads(arguments)
+    except json.JSONDecodeError as e:
+        _log.warning(f"Failed to parse arguments for {name}: {e}")
+        return "I could not determine which action you want to perform"
+    _log.info(f"Calling tool {name} with {parsed_arguments}")
+    return run_tool_call(
+        name=name,
+        arguments=parsed_arguments,
+        query=query,
+        llm=llm,
+        config=config,
+    )
@@ -1,9 +1,12 @@
 import datetime
 from typing import Any
+from box import Box
 import duckdb
+import numpy as np
 import pandas as pd
 import requests
 from assistant.constants import HOME_LAT, HOME_LON
+from assistant.language_model.forecast_cache import ForecastCache
 from assistant.language_model.model import LanguageModel
 from assistant.language_model.utils import render_prompt
 import os
@@ -62,18 +65,27 @@ WEATHER_SYMBOLS = {
     26: "Moderate snowfall",
     27: "Heavy snowfall",
 }
+# Labels of the categorical parameters, and the value of their first label.
+CATEGORIES = {
+    "pcat": (0, list(PRECIPITATION_CATEGORIES.values())),
+    "tcc_mean": (0, list(ZERO_TO_EIGHT_SCALE.values())),
+    "Wsymb2": (1, list(WEATHER_SYMBOLS.values())),
+}
 
 
 _log = logging.getLogger(__name__)
 NAME = "get_weather"
+SMHI_URL = "http://opendata-download-metfcst.smhi.se/api/category/pmp3g/version/2/geotype/point/lon/{lon}/lat/{lat}/data.json"
+_forecasts: ForecastCache | None = None
 
 
 def main(
     query: str,
     llm: LanguageModel,
+    config: Box | None = None,
 ) -> str:
     """Get weather info"""
-    weather = get_weather_data()
+    weather = get_weather_data(config)
     current_datetime = current_datetime=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     query_prompt = render_prompt(
         prompt_name=NAME,
@@ -88,106 +100,145 @@ def main(
         system_prompt=query_prompt,
         user_prompt=query,
         use_extra_instructions=False,
+        tool=f"{NAME}.query",
     ).content
 
-    _log.info(f"Using query {query} on weather data.")
+    return summarize_query(
+        weather=weather,
+        sql_query=query,
+        user_prompt=query,
+        llm=llm,
+        current_datetime=current_datetime,
+    )
+
+
+def tool_schema(config: Box) -> dict:
+    """
+    Tool schema for native tool calling.
+
+    The model writes the SQL query directly, so only the summary needs another request.
+    """
+    columns = ["date", "time"] + list(NAME_MAPPING.values())
+    return {
+        "name": NAME,
+        "description": "Get information about the weather forecast.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sql_query": {
+                    "type": "string",
+                    "description": (
+                        "DuckDB SQL query on the table \"weather\" that fetches the data answering "
+                        f"the user's question. The table has the columns {', '.join(columns)}, "
+                        "one row per forecast hour. precipitation_type is one of "
+                        f"{', '.join(PRECIPITATION_CATEGORIES.values())}. Only aggregate functions "
+                        "are allowed. When the user simply asks for the weather, select temperature "
+                        "during the day, precipitation, wind speed and cloudiness."
+                    ),
+                },
+            },
+            "required": ["sql_query"],
+        },
+    }
+
+
+def run_tool(arguments: dict, query: str, llm: LanguageModel, config: Box) -> str:
+    """Run the SQL query from the tool call and summarize the result."""
+    return summarize_query(
+        weather=get_weather_data(config),
+        sql_query=arguments["sql_query"],
+        user_prompt=query,
+        llm=llm,
+        current_datetime=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+
+def summarize_query(
+    weather: pd.DataFrame,
+    sql_query: str,
+    user_prompt: str,
+    llm: LanguageModel,
+    current_datetime: str,
+) -> str:
+    """Run query on weather data and let the LLM describe the result."""
+    _log.info(f"Using query {sql_query} on weather data.")
     result = duckdb.query_df(
-        df=weather, virtual_table_name="weather", sql_query=query
+        df=weather, virtual_table_name="weather", sql_query=sql_query
     ).to_df()
     weather_prompt = render_prompt(
         prompt_name=NAME,
         weather_data=result,
-        query_used=query,
+        query_used=sql_query,
         current_datetime=current_datetime,
     )
     answer = llm.answer_prompt(
         system_prompt=weather_prompt,
-        user_prompt=query,
+        user_prompt=user_prompt,
+        tool=NAME,
     ).content
     _log.info(f"Returning weather answer '{answer}'")
 
     return answer
 
 
-def get_weather_data() -> pd.DataFrame:
+def get_weather_data(config: Box | None = None) -> pd.DataFrame:
+    """Forecast for home, from the forecast cache if it is enabled."""
     lat = round(float(os.getenv(HOME_LAT)), 6)
     lon = round(float(os.getenv(HOME_LON)), 6)
-    url = f"http://opendata-download-metfcst.smhi.se/api/category/pmp3g/version/2/geotype/point/lon/{lon}/lat/{lat}/data.json"
+    if config and config.weather.cache.enabled:
+        return get_forecast_cache(config).get(lat, lon)
+    url = config.weather.url if config else SMHI_URL
+    return parse_forecast(requests.get(url.format(lat=lat, lon=lon)).json())
+
+
+def get_forecast_cache(config: Box) -> ForecastCache:
+    """Create the forecast cache on first use."""
+    global _forecasts
+    if _forecasts is None:
+        _forecasts = ForecastCache.from_config(config, parse=parse_forecast)
+    return _forecasts
+
+
+def forecast_columns(response: dict) -> dict[str, Any]:
+    """
+    Columnar arrays from an SMHI pmp3g point forecast, one element per forecast hour.
 
-    response = requests.get(url).json()
+    Parameters not in NAME_MAPPING are skipped while reading. Categories are looked
+    up for whole columns at once, as pandas categoricals, which DuckDB reads as enums.
+    """
     time_series = response["timeSeries"]
+    values = {name: np.full(len(time_series), np.nan) for name in NAME_MAPPING}
+    for i, entry in enumerate(time_series):
+        for parameter in entry["parameters"]:
+            column = values.get(parameter["name"])
+            if column is not None:
+                column[i] = parameter["values"][0]
 
-    data = []
-    for entry in time_series:
-        for param in entry["parameters"]:
-            data.append(
-                {
-                    "time": entry["validTime"],
-                }
-                | param
-            )
-
-    df = pd.DataFrame(data)
-    df["values"] = df["values"].apply(lambda value_list: value_list[0])
-    df = df[
-        ~df.name.isin(
-            ["lcc_mean", "mcc_mean", "hcc_mean", "wd", "pmax", "pmin", "pmedian"]
-        )
-    ]
-    df["values"] = df[["name", "values"]].apply(
-        lambda data: map_value(name=data["name"], value=data["values"]),
-        axis=1,
-    )
-    df["name"] = df["name"].apply(lambda name: NAME_MAPPING[name])
-    weather = df.pivot(index="time", columns="name", values="values").reset_index()
-    datetimes = pd.to_datetime(weather["time"])
-    weather["date"] = datetimes.dt.date
-    weather["time"] = datetimes.dt.time
-
-    return weather
-
-
-def map_value(name: str, value: Any) -> Any:
-    """Map values to something more sensible based on name."""
-    match name:
-        case "spp":
-            return max(value, 0)
-        case "pcat":
-            value_cat = int(value)
-            return PRECIPITATION_CATEGORIES[value_cat]
-        case "pmin":
-            return value
-        case "pmean":
-            return value
-        case "pmax":
-            return value
-        case "pmedian":
-            return value
-        case "tcc_mean":
-            return ZERO_TO_EIGHT_SCALE[int(value)]
-        case "lcc_mean":
-            return ZERO_TO_EIGHT_SCALE[int(value)]
-        case "mcc_mean":
-            return ZERO_TO_EIGHT_SCALE[int(value)]
-        case "hcc_mean":
-            return ZERO_TO_EIGHT_SCALE[int(value)]
-        case "t":
-            return value
-        case "msl":
-            return value
-        case "vis":
-            return value
-        case "wd":
-            return value
-        case "ws":
-            return value
-        case "r":
-            return value
-        case "tstm":
-            return value
-        case "gust":
-            return value
-        case "Wsymb2":
-            return WEATHER_SYMBOLS[value]
-        case _:
-            raise ValueError()
+    values["spp"] = np.maximum(values["spp"], 0) # -9 if none
+    for name, (first_value, labels) in CATEGORIES.items():
+        codes = np.nan_to_num(values[name] - first_value, nan=-1).astype(np.int8)
+        values[name] = pd.Categorical.from_codes(codes, categories=labels)
+
+    datetimes = pd.to_datetime([entry["validTime"] for entry in time_series])
+    return {
+        "time": datetimes.time,
+        **{NAME_MAPPING[name]: values[name] for name in sorted(NAME_MAPPING, key=NAME_MAPPING.get)},
+        "date": datetimes.date,
+    }
+
+
+def parse_forecast(response: dict) -> pd.DataFrame:
+    """Table with one row per forecast hour from an SMHI pmp3g point forecast."""
+    return pd.DataFrame(forecast_columns(response))
+
+
+def load_forecast(
+    response: dict,
+    connection: duckdb.DuckDBPyConnection,
+    table_name: str = "weather",
+) -> None:
+    """Load a forecast into a DuckDB table, replacing it if it exists."""
+    weather = parse_forecast(response)
+    connection.register("forecast_columns", weather)
+    connection.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM forecast_columns")
+    connection.unregister("forecast_columns")
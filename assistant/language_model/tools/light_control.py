@@ -1,5 +1,4 @@
 
-import json
 import os
 from assistant.constants import DIRIGERA_IP, DIRIGERA_TOKEN
 from assistant.language_model.model import LanguageModel
@@ -25,29 +24,82 @@ def main(
         prompt_name=NAME,
         light_names=", ".join(light_names),
     )
-    answer = llm.answer_prompt(
+    answer_dict = llm.answer_json(
         system_prompt=system_prompt,
         user_prompt=query,
-    ).content
-    try:
-        answer_dict = json.loads(answer)
-    except json.JSONDecodeError as e:
-        _log.warning(f"Failed: {e}")
-        return ""
-    
-    hub = dirigera.Hub(
-        token=os.getenv(DIRIGERA_TOKEN),
-        ip_address=os.getenv(DIRIGERA_IP)
+        schema=output_schema(config),
+        tool=NAME,
     )
+    if answer_dict is None:
+        return ""
+
     _log.info(f"Using params {answer_dict}")
     perform_light_action(
         params=answer_dict,
-        hub=hub,
+        hub=get_hub(),
         light_names=light_names,
     )
 
     return answer_dict["message"]
 
+def tool_schema(config: Box) -> dict:
+    """Tool schema for native tool calling."""
+    return {
+        "name": NAME,
+        "description": "Adjust color or on/off status for a light source in the home.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "enum": list(config.smart_home.dirigera.rooms),
+                    "description": "The device name.",
+                },
+                "color": {
+                    "type": "string",
+                    "description": "Color to set lamps to, in hex. Leave out if the user does not specify color.",
+                },
+                "is_on": {
+                    "type": "boolean",
+                    "description": "If the light should be on or off. Leave out if not specified by user.",
+                },
+                "message": {
+                    "type": "string",
+                    "description": "Clever and funny message to the user, in past tense, saying what you did.",
+                },
+            },
+            "required": ["name", "message"],
+        },
+    }
+
+def output_schema(config: Box) -> dict:
+    """
+    Schema of the JSON answer to the light_control prompt.
+
+    Same as the tool parameters, but any light name is accepted, since
+    perform_light_action matches names that are close enough.
+    """
+    parameters = tool_schema(config)["parameters"]
+    name = {key: value for key, value in parameters["properties"]["name"].items() if key != "enum"}
+    return {**parameters, "properties": {**parameters["properties"], "name": name}}
+
+def run_tool(arguments: dict, query: str, llm: LanguageModel, config: Box) -> str:
+    """Control lights with arguments resolved by native tool calling."""
+    _log.info(f"Using params {arguments}")
+    perform_light_action(
+        params=arguments,
+        hub=get_hub(),
+        light_names=config.smart_home.dirigera.rooms,
+    )
+    return arguments["message"]
+
+def get_hub() -> dirigera.Hub:
+    """Connect to the dirigera hub."""
+    return dirigera.Hub(
+        token=os.getenv(DIRIGERA_TOKEN),
+        ip_address=os.getenv(DIRIGERA_IP)
+    )
+
 def perform_light_action(
     params: dict,
     hub: dirigera.Hub,
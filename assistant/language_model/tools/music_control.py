@@ -1,5 +1,4 @@
 from enum import Enum
-import json
 
 import os
 from box import Box
@@ -55,39 +54,23 @@ def main(
     config: Box,
 ) -> str:
     """Control music."""
-    sp = spotipy.Spotify(
-        auth_manager=SpotifyOAuth(
-            client_id=os.getenv(SPOTIFY_CLIENT_ID),
-            client_secret=os.getenv(SPOTIFY_CLIENT_SECRET),
-            redirect_uri=os.getenv(SPOTIFY_REDIRECT_URL),
-            scope=[
-                "user-library-read",
-                "user-library-modify",
-                "user-read-playback-state",
-                "user-modify-playback-state",
-                "user-read-currently-playing",
-                "app-remote-control",
-                "streaming",
-            ],
-        )
-    )
+    sp = get_spotify()
     devices = sp.devices()["devices"]
     device_names = [device["name"] for device in devices]
     system_prompt = render_prompt(
         prompt_name=NAME,
-        actions=", ".join(MusicControlAction.__members__),
+        actions=", ".join(action.value for action in MusicControlAction),
         devices=", ".join(device_names),
-        play_types=", ".join(PlayType.__members__),
+        play_types=", ".join(play_type.value for play_type in PlayType),
         device_example=device_names[0],
     )
-    answer = llm.answer_prompt(
+    answer_dict = llm.answer_json(
         system_prompt=system_prompt,
         user_prompt=query,
-    ).content
-    try:
-        answer_dict = json.loads(answer)
-    except json.JSONDecodeError as e:
-        _log.warning(f"Failed: {e}")
+        schema=output_schema(config),
+        tool=NAME,
+    )
+    if answer_dict is None:
         return ""
 
     _log.info(f"Using params {answer_dict}")
@@ -101,6 +84,102 @@ def main(
     return answer_dict["message"] + response
 
 
+def tool_schema(config: Box) -> dict:
+    """
+    Tool schema for native tool calling.
+
+    Device names are not listed, since that would need a spotify request before the
+    model is even asked. Unknown devices fall back to the default device.
+    """
+    return {
+        "name": NAME,
+        "description": (
+            "Control music and other audio media. Help with anything related to music, "
+            "also for controlling music devices such as amplifiers."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": [action.value for action in MusicControlAction],
+                },
+                "device": {"type": "string", "description": "Name of music device to control."},
+                "query": {
+                    "type": "string",
+                    "description": "The music to play. Can be a name of a song, artist, book, playlist or similar.",
+                },
+                "play_type": {
+                    "type": "string",
+                    "enum": [play_type.value for play_type in PlayType],
+                    "description": "Type of media to play. Use playlist if the user asks for a genre.",
+                },
+                "volume_percent": {"type": "integer", "minimum": 0, "maximum": 100},
+                "message": {
+                    "type": "string",
+                    "description": "Fun, music related message to the user, in past tense, saying what you did.",
+                },
+            },
+            "required": ["action", "message"],
+        },
+    }
+
+
+def output_schema(config: Box) -> dict:
+    """Schema of the JSON answer to the music_control prompt, with the tool arguments under args."""
+    properties = dict(tool_schema(config)["parameters"]["properties"])
+    action, message = properties.pop("action"), properties.pop("message")
+    return {
+        "type": "object",
+        "properties": {
+            "action": action,
+            "args": {"type": "object", "properties": properties},
+            "message": message,
+        },
+        "required": ["action", "args", "message"],
+    }
+
+
+def run_tool(arguments: dict, query: str, llm: LanguageModel, config: Box) -> str:
+    """Control music with arguments resolved by native tool calling."""
+    _log.info(f"Using params {arguments}")
+    arguments = dict(arguments)
+    action = arguments.pop("action")
+    message = arguments.pop("message")
+    sp = get_spotify()
+    devices = sp.devices()["devices"]
+    if not any(device["name"].lower() == arguments.get("device", "").lower() for device in devices):
+        arguments.pop("device", None)
+    response = perform_music_action(
+        sp=sp,
+        action=action,
+        config=config,
+        devices=devices,
+        **arguments,
+    )
+    return message + response
+
+
+def get_spotify() -> spotipy.Spotify:
+    """Create authenticated spotify client."""
+    return spotipy.Spotify(
+        auth_manager=SpotifyOAuth(
+            client_id=os.getenv(SPOTIFY_CLIENT_ID),
+            client_secret=os.getenv(SPOTIFY_CLIENT_SECRET),
+            redirect_uri=os.getenv(SPOTIFY_REDIRECT_URL),
+            scope=[
+                "user-library-read",
+                "user-library-modify",
+                "user-read-playback-state",
+                "user-modify-playback-state",
+                "user-read-currently-playing",
+                "app-remote-control",
+                "streaming",
+            ],
+        )
+    )
+
+
 def perform_music_action(
     sp: spotipy.Spotify,
     action: MusicControlAction,
@@ -138,7 +217,7 @@ def perform_music_action(
         case MusicControlAction.VOLUME.value:
             sp.volume(**kwargs)
         case MusicControlAction.HELP.value:
-            actions = ", ".join(MusicControlAction.__members__)
+            actions = ", ".join(action.value for action in MusicControlAction)
             return f"{actions}"
         case MusicControlAction.LIST_DEVICES.value:
             return ", ".join([device["name"] for device in devices])
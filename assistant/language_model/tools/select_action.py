@@ -1,30 +1,80 @@
-import json
 from assistant.language_model.model import LanguageModel
-from assistant.language_model.utils import load_prompt, render_prompt
-from assistant.language_model.action import Action
+from assistant.language_model.utils import render_prompt
+from assistant.language_model.action import Action, tools
+from assistant.language_model.intent import IntentClassifier
 from box import Box
+import logging
 
+_log = logging.getLogger(__name__)
 NAME = "select_action"
-ACTIONS = "actions"
+_classifier: IntentClassifier | None = None
 
 def main(
     query: str, 
     llm: LanguageModel,
     config: Box,
-) -> tuple[Action, str]:
-    """Select action."""
+) -> tuple[list[tuple[Action, str]], str]:
+    """
+    Select actions and the part of the query each should carry out, and a confirmation.
+
+    Single commands are routed by the local intent classifier if it is confident,
+    everything else by the LLM, which can split a query into several actions.
+    """
+    classifier_config = config.language_model.intent_classifier
+    if classifier_config.enabled:
+        action = get_classifier(config).route(query)
+        if action is not None and tools.name(action.value) is not None:
+            _log.info(f"Intent classifier chose {action.name}.")
+            return [(action.value, query)], classifier_config.confirmation
+
     system_prompt = render_prompt(
         prompt_name=NAME,
-        actions = load_prompt(ACTIONS)
+        actions = tools.describe()
     )
-    answer = llm.answer_prompt(
+    answer_dict = llm.answer_json(
         system_prompt=system_prompt,
         user_prompt=query,
-    ).content
-    try:
-        answer_dict = json.loads(answer)
-    except json.JSONDecodeError as e:
-        print("Error when parsing json", e)
-        return Action.NO_ACTION, "I could not determine which action you want to perform"
-    
-    return answer_dict["action"], answer_dict["message"] 
\ No newline at end of file
+        schema=output_schema(),
+        tool=NAME,
+    )
+    if answer_dict is None:
+        return [(Action.NO_ACTION.value, query)], "I could not determine which action you want to perform"
+
+    actions = [
+        (action["action"], action.get("query") or query)
+        for action in answer_dict["actions"]
+    ]
+    return actions, answer_dict["message"]
+
+
+def output_schema() -> dict:
+    """Schema of the JSON answer to the select_action prompt."""
+    return {
+        "type": "object",
+        "properties": {
+            "actions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "action": {
+                            "type": "integer",
+                            "enum": [action["number"] for action in tools.describe().values()],
+                        },
+                        "query": {"type": "string"},
+                    },
+                    "required": ["action"],
+                },
+            },
+            "message": {"type": "string"},
+        },
+        "required": ["actions", "message"],
+    }
+
+
+def get_classifier(config: Box) -> IntentClassifier:
+    """Train the intent classifier on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier.from_config(config)
+    return _classifier
@@ -1,4 +1,9 @@
+from dataclasses import dataclass, field
+import glob
+import threading
+import time
 from box import Box
+import hashlib
 import yaml
 import os
 from jinja2 import Template
@@ -6,16 +11,98 @@ from jinja2 import Template
 PROMPT_DIR = "assistant/language_model/tools/prompts"
 
 
+@dataclass
+class PromptFile:
+    """Parsed prompt file with its templates compiled."""
+
+    mtime: float
+    prompts: Box
+    templates: dict[str, Template] = field(default_factory=dict)
+    hashes: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class RenderTiming:
+    """Accumulated render time of one template."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+class PromptRegistry:
+    """
+    Prompt files parsed and compiled once, instead of on every call.
+
+    A file is only read again when its modification time has changed, so prompts can
+    still be edited while the assistant is running.
+    """
+
+    def __init__(self, prompt_dir: str):
+        """Load and compile every prompt file in prompt_dir."""
+        self.prompt_dir = prompt_dir
+        self._files: dict[str, PromptFile] = {}
+        self._lock = threading.Lock()
+        self.timings: dict[str, RenderTiming] = {}
+        for path in glob.glob(os.path.join(prompt_dir, "*.yaml")):
+            self._get(os.path.splitext(os.path.basename(path))[0])
+
+    def _get(self, prompt_name: str) -> PromptFile:
+        """Return prompt file, reloading it if it changed on disk."""
+        path = os.path.join(self.prompt_dir, f"{prompt_name}.yaml")
+        mtime = os.stat(path).st_mtime
+        prompt_file = self._files.get(prompt_name)
+        if prompt_file is None or prompt_file.mtime != mtime:
+            with open(path, "r") as file:
+                prompts = Box(yaml.safe_load(file))
+            prompt_file = PromptFile(mtime=mtime, prompts=prompts)
+            for key, value in prompts.items():
+                if isinstance(value, str):
+                    prompt_file.templates[key] = Template(value)
+                    prompt_file.hashes[key] = hashlib.sha256(value.encode("utf8")).hexdigest()[:16]
+            with self._lock:
+                self._files[prompt_name] = prompt_file
+        return prompt_file
+
+    def load(self, prompt_name: str) -> Box:
+        """Return the parsed prompt file."""
+        return self._get(prompt_name).prompts
+
+    def render(self, prompt_name: str, prompt_key: str = "prompt", **kwargs) -> str:
+        """Render a template, recording how long it took."""
+        start = time.perf_counter()
+        rendered = self._get(prompt_name).templates[prompt_key].render(**kwargs)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            timing = self.timings.setdefault(f"{prompt_name}.{prompt_key}", RenderTiming())
+            timing.count += 1
+            timing.total_seconds += seconds
+            timing.max_seconds = max(timing.max_seconds, seconds)
+        return rendered
+
+    def template_hash(self, prompt_name: str, prompt_key: str = "prompt") -> str:
+        """Short hash of a template's source."""
+        return self._get(prompt_name).hashes[prompt_key]
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Render count, mean and max time in microseconds per template."""
+        with self._lock:
+            return {
+                name: {
+                    "count": timing.count,
+                    "mean_us": timing.total_seconds / timing.count * 1e6,
+                    "max_us": timing.max_seconds * 1e6,
+                }
+                for name, timing in self.timings.items()
+            }
+
+
+prompts = PromptRegistry(PROMPT_DIR)
+
+
 def load_prompt(prompt_name: str) -> Box:
     """Load prompt with specified name."""
-    with open(
-        os.path.join(
-            PROMPT_DIR,
-            f"{prompt_name}.yaml",
-        ),
-        "r",
-    ) as file:
-        return Box(yaml.safe_load(file))
+    return prompts.load(prompt_name)
 
 
 def render_prompt(
@@ -24,6 +111,9 @@ def render_prompt(
     **kwargs,
 ) -> str:
     """Return rendered prompt"""
-    system_prompt = str(load_prompt(prompt_name)[prompt_key])
-    system_prompt_template = Template(system_prompt)
-    return system_prompt_template.render(**kwargs)
\ No newline at end of file
+    return prompts.render(prompt_name, prompt_key, **kwargs)
+
+
+def template_hash(prompt_name: str, prompt_key: str = "prompt") -> str:
+    """Short hash of a prompt template, so cached responses are invalidated when it is edited."""
+    return prompts.template_hash(prompt_name, prompt_key)
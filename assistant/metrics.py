@@ -0,0 +1,189 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, TypeVar
+from box import Box
+
+_log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upper bounds in seconds, from fast local steps like intent classification to slow tool calls.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DURATION_METRIC = "assistant_stage_duration_seconds"
+ERRORS_METRIC = "assistant_stage_errors_total"
+
+
+@dataclass
+class Histogram:
+    """Cumulative duration histogram of one stage and action."""
+
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    count: int = 0
+    sum: float = 0.0
+    errors: int = 0
+
+    def observe(self, seconds: float) -> None:
+        """Add a duration."""
+        index = bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class MetricsRegistry:
+    """
+    Duration histograms, counts and errors per stage and action.
+
+    Rendered in the Prometheus text format, so the assistant can be scraped or its
+    metrics picked up by node_exporter's textfile collector.
+    """
+
+    def __init__(self):
+        """Create empty registry."""
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, action: str = "", error: bool = False) -> None:
+        """Record the duration of a stage, and whether it failed."""
+        with self._lock:
+            histogram = self._histograms.setdefault((stage, action), Histogram())
+            histogram.observe(seconds)
+            histogram.errors += error
+
+    @contextmanager
+    def timed(self, stage: str, action: str = "") -> Iterator[None]:
+        """Time the body as a stage, counting it as an error if it raises."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, action, error=error)
+
+    def timed_iterator(self, stage: str, items: Iterable[T], action: str = "") -> Iterator[T]:
+        """
+        Yield items, timing only the time spent producing them as a stage.
+
+        Time the consumer spends with each item, while this is suspended at yield, is
+        not counted, so a streamed stage is not charged for whatever consumes it.
+        """
+        items = iter(items)
+        elapsed = 0.0
+        error = False
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        except Exception:
+            error = True
+            raise
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            self.observe(stage, elapsed, action, error=error)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {DURATION_METRIC} Duration of each stage of handling an utterance.",
+            f"# TYPE {DURATION_METRIC} histogram",
+        ]
+        errors = [
+            f"# HELP {ERRORS_METRIC} Stages that raised an error.",
+            f"# TYPE {ERRORS_METRIC} counter",
+        ]
+        with self._lock:
+            for (stage, action), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",action="{action}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{DURATION_METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{DURATION_METRIC}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{DURATION_METRIC}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{DURATION_METRIC}_count{{{labels}}} {histogram.count}")
+                errors.append(f"{ERRORS_METRIC}{{{labels}}} {histogram.errors}")
+        return "\n".join(lines + errors) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(stage: str, action: str = ""):
+    """Time a block as a stage in the global registry."""
+    return REGISTRY.timed(stage, action)
+
+
+def timed_iterator(stage: str, items: Iterable[T], action: str = "") -> Iterator[T]:
+    """Time producing items as a stage in the global registry, excluding the consumer's time."""
+    return REGISTRY.timed_iterator(stage, items, action)
+
+
+def timed_function(stage: str) -> Callable:
+    """Decorator timing every call of a function as a stage."""
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with REGISTRY.timed(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the global registry on any path."""
+
+    def do_GET(self):
+        data = REGISTRY.render().encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_forever(path: str, interval: float) -> None:
+    """Periodically write the metrics to path, atomically so readers never see half a file."""
+    while True:
+        time.sleep(interval)
+        with open(path + ".tmp", "w") as file:
+            file.write(REGISTRY.render())
+        os.replace(path + ".tmp", path)
+
+
+def start_exporter(config: Box) -> None:
+    """Serve metrics on the configured port and/or write them to the configured file."""
+    metrics_config = config.metrics
+    if not metrics_config.enabled:
+        return
+    if metrics_config.port:
+        server = ThreadingHTTPServer((metrics_config.host, metrics_config.port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        _log.info(f"Serving metrics on http://{metrics_config.host}:{metrics_config.port}/metrics")
+    if metrics_config.textfile:
+        threading.Thread(
+            target=_write_forever,
+            args=(metrics_config.textfile, metrics_config.write_interval_seconds),
+            daemon=True,
+        ).start()
+        _log.info(f"Writing metrics to {metrics_config.textfile}")
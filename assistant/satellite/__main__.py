@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from box import Box
+from dotenv import load_dotenv
+import yaml
+
+from assistant.language_model.action import tools
+from assistant.language_model.model import LanguageModel
+from assistant.metrics import start_exporter
+from assistant.satellite.server import SatelliteServer
+from assistant.speech_to_text.backends import get_transcriber
+from assistant.text_to_speech.model import TTS
+
+log_ = logging.getLogger(__name__)
+
+
+def main(config: Box):
+    """Start central assistant serving satellites."""
+    start_exporter(config)
+    if config.language_model.prewarm_tools:
+        tools.prewarm()
+    server = SatelliteServer(
+        transcriber=get_transcriber(config=config),
+        llm=LanguageModel(config=config),
+        tts=TTS(config=config),
+        config=config,
+    )
+    log_.info("Initialized transcriber, llm client.")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    try:
+        main(config=config)
+    except KeyboardInterrupt:
+        log_.info("Stopping satellite server.")
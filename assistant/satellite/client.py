@@ -0,0 +1,75 @@
+"""
+Thin satellite: streams the microphone to the central assistant and plays back the answers.
+
+Usage: python -m assistant.satellite.client server_host [capture_device]
+"""
+import asyncio
+import logging
+import sys
+from box import Box
+import numpy as np
+import sounddevice as sd
+import yaml
+
+from assistant.satellite.protocol import (
+    MessageType,
+    mu_law_decode,
+    mu_law_encode,
+    read_message,
+    write_message,
+)
+from assistant.speech_to_text.audio import SAMPLE_RATE
+from assistant.text_to_speech.model import SAMPLE_RATE as TTS_SAMPLE_RATE
+
+_log = logging.getLogger(__name__)
+
+BLOCK_MS = 100
+
+
+async def send_microphone(writer: asyncio.StreamWriter, capture_device: int | None) -> None:
+    """Send mu-law encoded microphone audio in BLOCK_MS chunks."""
+    loop = asyncio.get_running_loop()
+    blocks: asyncio.Queue[np.ndarray] = asyncio.Queue()
+
+    def callback(indata: np.ndarray, frames: int, time_info, status) -> None:
+        loop.call_soon_threadsafe(blocks.put_nowait, indata[:, 0].copy())
+
+    with sd.InputStream(
+        samplerate=SAMPLE_RATE,
+        channels=1,
+        dtype="int16",
+        blocksize=SAMPLE_RATE * BLOCK_MS // 1000,
+        device=capture_device,
+        callback=callback,
+    ):
+        while True:
+            write_message(writer, MessageType.AUDIO, mu_law_encode(await blocks.get()))
+            await writer.drain()
+
+
+async def play_responses(reader: asyncio.StreamReader) -> None:
+    """Play speech from the server as it arrives."""
+    with sd.OutputStream(samplerate=TTS_SAMPLE_RATE, channels=1, dtype="int16") as output:
+        while True:
+            message_type, payload = await read_message(reader)
+            if message_type == MessageType.TTS_AUDIO:
+                await asyncio.to_thread(output.write, mu_law_decode(payload))
+            elif message_type == MessageType.TEXT:
+                _log.info(f"Assistant: {payload.decode('utf8')}")
+
+
+async def main(host: str, port: int, capture_device: int | None):
+    """Connect to the server and run until disconnected."""
+    reader, writer = await asyncio.open_connection(host, port)
+    _log.info(f"Connected to {host}:{port}.")
+    await asyncio.gather(send_microphone(writer, capture_device), play_responses(reader))
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    asyncio.run(main(
+        host=sys.argv[1],
+        port=config.satellite.port,
+        capture_device=int(sys.argv[2]) if len(sys.argv) > 2 else None,
+    ))
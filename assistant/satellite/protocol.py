@@ -0,0 +1,49 @@
+"""
+Framing and audio compression for the satellite protocol.
+
+Every message is a one byte message type, a four byte big endian payload length
+and the payload. Audio in both directions is 8 bit mu-law, half the size of
+16 bit PCM: satellites send 16 kHz microphone audio, the server sends back
+piper audio at the TTS sample rate.
+"""
+import asyncio
+from enum import IntEnum
+import struct
+import numpy as np
+
+HEADER = struct.Struct(">BI")
+MU = 255
+
+
+class MessageType(IntEnum):
+    """Satellite protocol message types."""
+
+    AUDIO = 1 # satellite -> server, mu-law microphone audio
+    TEXT = 2 # server -> satellite, utf8 text being spoken
+    TTS_AUDIO = 3 # server -> satellite, mu-law speech
+    TTS_END = 4 # server -> satellite, the response is complete
+
+
+def mu_law_encode(pcm: np.ndarray) -> bytes:
+    """Compress int16 PCM to 8 bit mu-law."""
+    audio = pcm.astype(np.float32) / 32768.0
+    compressed = np.sign(audio) * np.log1p(MU * np.abs(audio)) / np.log1p(MU)
+    return ((compressed + 1) / 2 * MU + 0.5).astype(np.uint8).tobytes()
+
+
+def mu_law_decode(data: bytes) -> np.ndarray:
+    """Expand 8 bit mu-law to int16 PCM."""
+    compressed = np.frombuffer(data, dtype=np.uint8).astype(np.float32) / MU * 2 - 1
+    audio = np.sign(compressed) * ((1 + MU) ** np.abs(compressed) - 1) / MU
+    return (audio * 32767).astype(np.int16)
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[MessageType, bytes]:
+    """Read one message. Raises asyncio.IncompleteReadError when the connection closes."""
+    message_type, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return MessageType(message_type), await reader.readexactly(length)
+
+
+def write_message(writer: asyncio.StreamWriter, message_type: MessageType, payload: bytes = b"") -> None:
+    """Queue one message for sending, await writer.drain() to apply backpressure."""
+    writer.write(HEADER.pack(message_type, len(payload)) + payload)
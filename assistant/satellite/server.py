@@ -0,0 +1,272 @@
+import asyncio
+from dataclasses import dataclass
+import logging
+from box import Box
+import numpy as np
+
+from assistant.language_model.action import run_actions
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.tools import call_tools, select_action
+from assistant.satellite.protocol import (
+    MessageType,
+    mu_law_decode,
+    mu_law_encode,
+    read_message,
+    write_message,
+)
+from assistant.speech_to_text.audio import SAMPLE_RATE, RingBuffer
+from assistant.speech_to_text.backends import Transcriber
+from assistant.speech_to_text.vad import VadEventType, VoiceActivityDetector
+from assistant.text_to_speech.model import TTS
+from assistant.utils import WakeWordMatcher
+
+_log = logging.getLogger(__name__)
+
+BATCH_GAP_SECONDS = 1.0 # silence between utterances transcribed in the same batch
+TTS_CHUNK_BYTES = 4096
+WHISPER_WINDOW_SECONDS = 30
+WHISPER_CONTEXT_FRAMES = 1500 # audio context frames covering the whole window
+
+
+def audio_context_seconds(config: Box) -> float:
+    """Seconds of audio whisper can see, limited by audio_context_len for the whisper.cpp backends."""
+    context = config.speech_to_text.whisper_cpp.audio_context_len
+    if not config.speech_to_text.backend.startswith("whisper_cpp") or not context:
+        return WHISPER_WINDOW_SECONDS
+    return WHISPER_WINDOW_SECONDS * min(context, WHISPER_CONTEXT_FRAMES) / WHISPER_CONTEXT_FRAMES
+
+
+@dataclass
+class PendingUtterance:
+    """Audio of a finished utterance from one satellite, waiting for transcription."""
+
+    satellite: "Satellite"
+    audio: np.ndarray
+
+
+class Satellite:
+    """Server side state of one connected satellite."""
+
+    def __init__(self, name: str, writer: asyncio.StreamWriter, config: Box):
+        """Allocate audio buffer and vad for the satellite."""
+        self.name = name
+        self.writer = writer
+        self.buffer = RingBuffer(capacity=SAMPLE_RATE * config.satellite.max_utterance_seconds)
+        self.vad = VoiceActivityDetector(config)
+        self._utterance_start = None
+        self.response_lock = asyncio.Lock() # responses to one satellite are spoken in order
+
+    def add_audio(self, pcm: np.ndarray) -> list[np.ndarray]:
+        """Buffer int16 audio and return copies of any utterances it finished."""
+        self.buffer.write(pcm)
+        finished = []
+        for event in self.vad.process(pcm):
+            if event.type == VadEventType.START:
+                self._utterance_start = event.position
+            elif self._utterance_start is not None:
+                audio = self.buffer.read_since(self._utterance_start)
+                finished.append(audio[:event.position - self._utterance_start])
+                self._utterance_start = None
+        return finished
+
+
+def transcribe_batch(transcriber: Transcriber, audios: list[np.ndarray]) -> list[str]:
+    """
+    Transcribe several utterances with a single model call.
+
+    Whisper always encodes a 30 second window, so short utterances from different
+    satellites are concatenated with silence in between, and the resulting segments
+    are assigned back to the utterance they overlap the most.
+    """
+    gap = np.zeros(int(BATCH_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+    starts = []
+    position = 0
+    parts = []
+    for audio in audios:
+        starts.append(position / SAMPLE_RATE)
+        parts += [audio, gap]
+        position += len(audio) + len(gap)
+    ends = [start + len(audio) / SAMPLE_RATE for start, audio in zip(starts, audios)]
+
+    texts = [[] for _ in audios]
+    for segment in transcriber.transcribe(np.concatenate(parts)):
+        overlaps = [
+            min(segment.end, end) - max(segment.start, start)
+            for start, end in zip(starts, ends)
+        ]
+        texts[int(np.argmax(overlaps))].append(segment.text)
+    return [" ".join(text) for text in texts]
+
+
+class SatelliteServer:
+    """
+    Central assistant serving many thin satellites over TCP.
+
+    Satellites stream mu-law microphone audio, the server finds utterances with a
+    vad per satellite, transcribes them in batches across satellites and answers
+    through the usual select_action / run_actions path. Piper audio is streamed back
+    to the satellite the utterance came from.
+    """
+
+    def __init__(self, transcriber: Transcriber, llm: LanguageModel, tts: TTS, config: Box):
+        """Initialize server."""
+        self.transcriber = transcriber
+        self.llm = llm
+        self.tts = tts
+        self.config = config
+        self.batch_window = config.satellite.batch_window_ms / 1000
+        self.max_utterance_samples = int(audio_context_seconds(config) * SAMPLE_RATE)
+        self.max_batch_seconds = min(config.satellite.max_batch_seconds, audio_context_seconds(config))
+        self.wake_word_matcher = WakeWordMatcher.from_config(config)
+        self._pending: asyncio.Queue[PendingUtterance] = asyncio.Queue()
+        self._overflow: PendingUtterance | None = None # did not fit in the previous batch
+        self._responses: set[asyncio.Task] = set() # keep references so tasks are not garbage collected
+
+    async def serve_forever(self) -> None:
+        """Accept satellites and process their audio."""
+        server = await asyncio.start_server(
+            self._handle_satellite,
+            host=self.config.satellite.host,
+            port=self.config.satellite.port,
+        )
+        _log.info(f"Satellite server listening on {self.config.satellite.host}:{self.config.satellite.port}.")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self._transcribe_forever())
+
+    async def _handle_satellite(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read audio from one satellite until it disconnects."""
+        name = "{}:{}".format(*writer.get_extra_info("peername")[:2])
+        satellite = Satellite(name=name, writer=writer, config=self.config)
+        _log.info(f"Satellite {name} connected.")
+        try:
+            while True:
+                message_type, payload = await read_message(reader)
+                if message_type != MessageType.AUDIO:
+                    _log.warning(f"Unexpected message {message_type.name} from {name}.")
+                    continue
+                for audio in satellite.add_audio(mu_law_decode(payload)):
+                    await self._pending.put(PendingUtterance(satellite=satellite, audio=audio))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            _log.info(f"Satellite {name} disconnected.")
+        finally:
+            writer.close()
+
+    async def _transcribe_forever(self) -> None:
+        """Collect utterances for up to batch_window and transcribe them together."""
+        while True:
+            first = self._overflow or await self._next_utterance()
+            self._overflow = None
+            batch = [first]
+            seconds = len(first.audio) / SAMPLE_RATE
+            deadline = asyncio.get_running_loop().time() + self.batch_window
+            while True:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._next_utterance(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                added = BATCH_GAP_SECONDS + len(pending.audio) / SAMPLE_RATE
+                if seconds + added > self.max_batch_seconds:
+                    self._overflow = pending # starts the next batch
+                    break
+                batch.append(pending)
+                seconds += added
+
+            try:
+                texts = await asyncio.to_thread(
+                    transcribe_batch, self.transcriber, [pending.audio for pending in batch]
+                )
+            except Exception:
+                _log.exception(f"Failed to transcribe batch of {len(batch)} utterances.")
+                for satellite in {pending.satellite for pending in batch}:
+                    self._start(self._answer(satellite, self.config.error_message))
+                continue
+            _log.info(f"Transcribed batch of {len(batch)} utterances ({seconds:.1f} s audio).")
+            for pending, text in zip(batch, texts):
+                self._start(self._respond(pending.satellite, text))
+
+    def _start(self, coroutine) -> None:
+        """Run a response in the background, keeping a reference until it is done."""
+        task = asyncio.create_task(coroutine)
+        self._responses.add(task)
+        task.add_done_callback(self._responses.discard)
+
+    async def _next_utterance(self) -> PendingUtterance:
+        """Next pending utterance, cut to the audio context so whisper sees all of it."""
+        pending = await self._pending.get()
+        if len(pending.audio) > self.max_utterance_samples:
+            _log.warning(
+                f"[{pending.satellite.name}] Utterance of {len(pending.audio) / SAMPLE_RATE:.1f} s "
+                f"cut to {self.max_utterance_samples / SAMPLE_RATE:.1f} s."
+            )
+            pending.audio = pending.audio[:self.max_utterance_samples]
+        return pending
+
+    async def _respond(self, satellite: Satellite, transcription: str) -> None:
+        """Handle transcription from a satellite and speak the answer back to it."""
+        if not transcription or not self.wake_word_matcher.matches(transcription):
+            return
+        _log.info(f"[{satellite.name}] Got transcription {transcription}.")
+        async with satellite.response_lock:
+            try:
+                if self.config.language_model.native_tool_calling:
+                    response = await asyncio.to_thread(
+                        call_tools.main, query=transcription, llm=self.llm, config=self.config
+                    )
+                else:
+                    actions, message = await asyncio.to_thread(
+                        select_action.main, query=transcription, llm=self.llm, config=self.config
+                    )
+                    # Run the action while the confirmation is streamed to the satellite.
+                    confirmation = asyncio.create_task(self._speak(satellite, message))
+                    try:
+                        response = await asyncio.to_thread(
+                            run_actions, actions=actions, llm=self.llm, config=self.config
+                        )
+                    finally:
+                        await confirmation
+            except ConnectionError:
+                _log.info(f"[{satellite.name}] Disconnected while answering.")
+                return
+            except Exception:
+                _log.exception(f"[{satellite.name}] Failed to handle '{transcription}'.")
+                response = self.config.error_message
+            await self._answer(satellite, response)
+
+    async def _answer(self, satellite: Satellite, response: str) -> None:
+        """Speak the response and tell the satellite the answer is complete."""
+        try:
+            await self._speak(satellite, response)
+            write_message(satellite.writer, MessageType.TTS_END)
+            await satellite.writer.drain()
+        except ConnectionError:
+            _log.info(f"[{satellite.name}] Disconnected while answering.")
+
+    async def _speak(self, satellite: Satellite, text: str) -> None:
+        """Stream piper audio for text to the satellite as it is synthesized."""
+        if not text:
+            return
+        write_message(satellite.writer, MessageType.TEXT, text.encode("utf8"))
+        process = await asyncio.create_subprocess_shell(
+            self.tts.raw_audio_command(text),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        leftover = b""
+        try:
+            while chunk := await process.stdout.read(TTS_CHUNK_BYTES):
+                chunk = leftover + chunk
+                usable = len(chunk) - len(chunk) % 2 # keep 16 bit samples whole
+                leftover = chunk[usable:]
+                write_message(
+                    satellite.writer,
+                    MessageType.TTS_AUDIO,
+                    mu_law_encode(np.frombuffer(chunk[:usable], dtype=np.int16)),
+                )
+                await satellite.writer.drain()
+        finally:
+            if process.returncode is None and not process.stdout.at_eof():
+                process.kill() # the satellite is gone, stop synthesizing
+            await process.wait()
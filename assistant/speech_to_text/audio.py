@@ -0,0 +1,95 @@
+import threading
+import wave
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def read_wav(path: str) -> np.ndarray:
+    """Read a 16 kHz mono 16 bit WAV file into an int16 array."""
+    with wave.open(path, "rb") as file:
+        if file.getframerate() != SAMPLE_RATE or file.getnchannels() != 1 or file.getsampwidth() != 2:
+            raise ValueError(f"{path} must be a 16 kHz mono 16 bit WAV file.")
+        return np.frombuffer(file.readframes(file.getnframes()), dtype=np.int16)
+
+
+def write_wav(path: str, audio: np.ndarray) -> None:
+    """Write 16 kHz float32 or int16 audio to a mono 16 bit WAV file."""
+    if audio.dtype != np.int16:
+        audio = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        file.writeframes(audio.tobytes())
+
+
+def pcm_to_float(pcm: np.ndarray) -> np.ndarray:
+    """Convert int16 PCM to float32 in [-1, 1]."""
+    return pcm.astype(np.float32) / 32768.0
+
+
+class RingBuffer:
+    """
+    Fixed size float32 audio buffer that is written to in place.
+
+    Keeps track of the total number of samples written so that readers can ask for
+    audio relative to an absolute sample position.
+    """
+
+    def __init__(self, capacity: int):
+        """Preallocate buffer with room for capacity samples."""
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._lock = threading.Lock()
+        self.total_written = 0
+        self._cleared_at = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, converting int16 PCM to float32 without intermediate arrays."""
+        scale = 1 / 32768.0 if samples.dtype == np.int16 else 1.0
+        skipped = max(len(samples) - self.capacity, 0)
+        samples = samples[skipped:]
+        with self._lock:
+            self.total_written += skipped
+            start = self.total_written % self.capacity
+            first = min(len(samples), self.capacity - start)
+            np.multiply(samples[:first], scale, out=self._buffer[start:start + first], casting="unsafe")
+            np.multiply(samples[first:], scale, out=self._buffer[:len(samples) - first], casting="unsafe")
+            self.total_written += len(samples)
+
+    @property
+    def available(self) -> int:
+        """Number of samples that can currently be read."""
+        return min(self.total_written - self._cleared_at, self.capacity)
+
+    def read_last(self, n_samples: int, out: np.ndarray | None = None) -> np.ndarray:
+        """Return the most recent n_samples (or fewer if not available) in chronological order."""
+        with self._lock:
+            return self._read_last(n_samples, out)
+
+    def read_since(self, position: int, out: np.ndarray | None = None) -> np.ndarray:
+        """Return all samples written after the absolute sample position."""
+        # The length and the copy must see the same total_written, or a concurrent write shifts the window.
+        with self._lock:
+            return self._read_last(self.total_written - position, out)
+
+    def _read_last(self, n_samples: int, out: np.ndarray | None) -> np.ndarray:
+        """read_last, with the lock already held."""
+        n_samples = min(n_samples, self.available)
+        if out is None:
+            out = np.empty(n_samples, dtype=np.float32)
+        out = out[:n_samples]
+        end = self.total_written % self.capacity
+        start = end - n_samples
+        if start >= 0:
+            out[:] = self._buffer[start:end]
+        else:
+            out[:-start] = self._buffer[start:]
+            out[-start:] = self._buffer[:end]
+        return out
+
+    def clear(self) -> None:
+        """Discard everything written so far."""
+        with self._lock:
+            self._cleared_at = self.total_written
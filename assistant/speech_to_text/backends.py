@@ -0,0 +1,40 @@
+import importlib
+from typing import Callable, Protocol
+from box import Box
+import numpy as np
+
+from assistant.speech_to_text.events import Segment, UtteranceQueue
+
+# Backend name -> module containing a Transcriber class. Modules are imported on
+# demand, so heavy dependencies (torch, pywhispercpp...) are only loaded when used.
+BACKENDS = {
+    "whisper_cpp_stream": "assistant.speech_to_text.model",
+    "whisper_cpp": "assistant.speech_to_text.whisper_cpp",
+    "whisper_py": "assistant.speech_to_text.whisper_py",
+    "multi_device": "assistant.speech_to_text.multi_device",
+}
+
+
+class Transcriber(Protocol):
+    """Interface every speech to text backend implements."""
+
+    # Called with partial hypotheses of the utterance in progress, by backends that support it.
+    on_partial: Callable[[str], None] | None
+
+    def __init__(self, config: Box):
+        """Load the model. Must not start capturing audio."""
+
+    def start(self) -> UtteranceQueue:
+        """Start capturing and return the queue that finished utterances are put in."""
+
+    def transcribe(self, audio: np.ndarray, offset: float = 0.0) -> list[Segment]:
+        """Transcribe 16 kHz float32 audio, offset is added to segment timestamps."""
+
+
+def get_transcriber(config: Box, backend: str | None = None) -> Transcriber:
+    """Create the transcriber selected by config.speech_to_text.backend (or backend if given)."""
+    backend = backend or config.speech_to_text.backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown speech to text backend {backend}, choose one of {', '.join(BACKENDS)}.")
+    module = importlib.import_module(BACKENDS[backend])
+    return module.Transcriber(config=config)
@@ -0,0 +1,100 @@
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+import logging
+import threading
+import time
+from typing import Iterator
+from box import Box
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class Segment:
+    """A transcribed piece of speech."""
+
+    text: str
+    start: float # seconds since the transcriber started listening
+    end: float
+    confidence: float | None = None
+
+
+@dataclass
+class Utterance:
+    """A finished utterance, ready to be handled by the assistant."""
+
+    text: str
+    segments: list[Segment] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+    device: int | str | None = None # capture device the utterance was heard on, if known
+    queue_latency: float | None = None # seconds spent waiting in the queue
+
+
+class DropPolicy(Enum):
+    """What to do with new utterances when the queue is full."""
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class UtteranceQueue:
+    """
+    Bounded, thread safe queue of finished utterances.
+
+    Transcribers put utterances from their own thread, so audio keeps being drained
+    while the assistant is busy with the LLM or TTS. Consume it with a plain for
+    loop, which ends when the transcriber closes the queue.
+    """
+
+    def __init__(self, max_size: int, drop_policy: DropPolicy | str = DropPolicy.DROP_OLDEST):
+        """Initialize empty queue."""
+        self.max_size = max_size
+        self.drop_policy = DropPolicy(drop_policy)
+        self.n_dropped = 0
+        self._utterances: deque[Utterance] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config: Box) -> "UtteranceQueue":
+        """Create queue from speech to text config."""
+        queue_config = config.speech_to_text.utterance_queue
+        return cls(max_size=queue_config.max_size, drop_policy=queue_config.drop_policy)
+
+    def put(self, utterance: Utterance) -> None:
+        """Add utterance, dropping one according to the drop policy if the queue is full."""
+        with self._condition:
+            if len(self._utterances) >= self.max_size:
+                self.n_dropped += 1
+                if self.drop_policy == DropPolicy.DROP_NEWEST:
+                    _log.warning(f"Utterance queue full, dropping '{utterance.text}'.")
+                    return
+                dropped = self._utterances.popleft()
+                _log.warning(f"Utterance queue full, dropping '{dropped.text}'.")
+            self._utterances.append(utterance)
+            self._condition.notify()
+
+    def get(self, timeout: float | None = None) -> Utterance | None:
+        """Block until an utterance is available. Returns None on timeout or when closed."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._utterances or self._closed, timeout=timeout)
+            if not self._utterances:
+                return None
+            utterance = self._utterances.popleft()
+        utterance.queue_latency = time.monotonic() - utterance.created_at
+        _log.info(f"Utterance waited {utterance.queue_latency * 1000:.0f} ms in queue.")
+        return utterance
+
+    def close(self) -> None:
+        """Stop iteration once the queue has been drained."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._utterances)
+
+    def __iter__(self) -> Iterator[Utterance]:
+        while (utterance := self.get()) is not None:
+            yield utterance
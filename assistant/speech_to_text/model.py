@@ -1,11 +1,24 @@
-from typing import Generator
 from box import Box
+import json
 import subprocess
 import os
 import logging
+import re
+import tempfile
+import threading
+import time
+import numpy as np
+
+from assistant.metrics import REGISTRY, timed_function
+from assistant.speech_to_text.audio import write_wav
+from assistant.speech_to_text.events import Segment, Utterance, UtteranceQueue
 
 _log = logging.getLogger(__name__)
 
+START_SPEAKING = "[Start speaking]" # printed by stream right before it starts its clock
+# Printed by stream with vad once an utterance is decoded, t1 is when it ended on stream's clock.
+_TRANSCRIPTION_START = re.compile(r"### Transcription \d+ START \| t0 = -?\d+ ms \| t1 = (\d+) ms")
+
 class Transcriber:
     """Simple Whisper CPP model wrapper."""
 
@@ -20,18 +33,20 @@ class Transcriber:
         self.audio_context_len = cpp_config.audio_context_len
         self.vad_thold = cpp_config.vad_thold
         self.file_path = cpp_config.file_path
+        self.language = config.language
 
         self.last_transcription = None
+        self._stream_started_at = None # time.monotonic() when stream started listening
+        self.utterances = UtteranceQueue.from_config(config)
+        self.on_partial = None # partial hypotheses are not supported
 
-
-
-    def start(self) -> Generator[str | None, None, None]:
-        """Start transcription in subprocess, return transcriptions as generator."""
+    def start(self) -> UtteranceQueue:
+        """Start transcription in subprocess, return queue of finished utterances."""
         stream_cmd = [
             "./stream",
             "-m", f"models/ggml-{self.model}.bin",
             "--step", "0",
-            "--language", "swedish",
+            "--language", f"{self.language}",
             "--length", f"{self.length}",
             "--capture", f"{self.capture_device}",
             "--threads", f"{self.n_threads}",
@@ -50,13 +65,68 @@ class Transcriber:
             shell=False,
             encoding="utf8"
         )
-        for line in iter(self._p.stdout.readline, ""):
-            if line[0] == "[":
-                self.last_transcription = line.split("]")[-1].strip()
-            if "###" in line and "END" in line:
-                _log.info(f"Got sentence {self.last_transcription}")
-                yield self.last_transcription
-            yield None
+        threading.Thread(target=self._read_output, daemon=True).start()
+        return self.utterances
+
+    def _read_output(self) -> None:
+        """Drain whisper.cpp stdout, putting finished utterances in the queue."""
+        try:
+            for line in iter(self._p.stdout.readline, ""):
+                self._observe_decode(line)
+                if line[0] == "[":
+                    self.last_transcription = line.split("]")[-1].strip()
+                if "###" in line and "END" in line and self.last_transcription:
+                    _log.info(f"Got sentence {self.last_transcription}")
+                    self.utterances.put(Utterance(text=self.last_transcription))
+                    self.last_transcription = None
+        except Exception:
+            _log.exception("Reading whisper.cpp output failed, no more utterances will be heard.")
+        finally:
+            self.utterances.close()
+
+    def _observe_decode(self, line: str) -> None:
+        """Record how long stream took to decode an utterance, from the end of the speech to its output."""
+        if line.startswith(START_SPEAKING):
+            self._stream_started_at = time.monotonic()
+        elif self._stream_started_at is not None and (match := _TRANSCRIPTION_START.search(line)):
+            ended_at = self._stream_started_at + int(match.group(1)) / 1000
+            REGISTRY.observe("transcribe", max(time.monotonic() - ended_at, 0.0))
+
+    @timed_function("transcribe")
+    def transcribe(self, audio: np.ndarray, offset: float = 0.0) -> list[Segment]:
+        """Transcribe float32 audio by running the whisper.cpp main binary on a temporary wav file."""
+        with tempfile.TemporaryDirectory() as directory:
+            wav_path = os.path.join(directory, "audio.wav")
+            output_path = os.path.join(directory, "result")
+            write_wav(wav_path, audio)
+            main_cmd = [
+                "./main",
+                "-m", f"models/ggml-{self.model}.bin",
+                "--language", f"{self.language}",
+                "--threads", f"{self.n_threads}",
+                "--audio-ctx", f"{self.audio_context_len}",
+                "--output-json",
+                "--output-file", output_path,
+                "--file", wav_path,
+            ]
+            subprocess.run(
+                args=main_cmd,
+                cwd=os.path.join(os.getcwd(), "whisper.cpp"),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            with open(output_path + ".json", "r") as file:
+                result = json.load(file)
+        return [
+            Segment(
+                text=item["text"].strip(),
+                start=offset + item["offsets"]["from"] / 1000,
+                end=offset + item["offsets"]["to"] / 1000,
+            )
+            for item in result["transcription"]
+            if item["text"].strip()
+        ]
 
 
 if __name__ == "__main__":
@@ -68,8 +138,8 @@ if __name__ == "__main__":
         
     model = Transcriber(config)
     try:
-        for line in model.start_transcribing():
-            print(line)
+        for utterance in model.start():
+            print(utterance.text)
     
     finally:
         os.killpg(pg_id, signal.SIGKILL)
\ No newline at end of file
@@ -0,0 +1,171 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import threading
+import time
+from box import Box
+import numpy as np
+import sounddevice as sd
+
+from assistant.speech_to_text import whisper_cpp
+from assistant.speech_to_text.audio import SAMPLE_RATE, RingBuffer
+from assistant.speech_to_text.events import Segment, Utterance, UtteranceQueue
+from assistant.speech_to_text.vad import VadEventType, VoiceActivityDetector
+from assistant.utils import is_similar
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceStats:
+    """Per device counters."""
+
+    queue_depth: int = 0 # utterances waiting for or being transcribed
+    n_utterances: int = 0
+    n_duplicates: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=100)) # end of speech to transcription
+
+    @property
+    def mean_latency(self) -> float:
+        return float(np.mean(self.latencies)) if self.latencies else 0.0
+
+
+class DeviceListener:
+    """Captures one device into its own ring buffer and finds utterance boundaries."""
+
+    def __init__(self, device: int | str, capacity: int, config: Box):
+        """Allocate buffer and vad for the device."""
+        self.device = device
+        self.buffer = RingBuffer(capacity=capacity)
+        self.vad = VoiceActivityDetector(config)
+        self.stats = DeviceStats()
+        self._vad_position = 0
+        self._utterance_start = None
+        self.stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+            device=device,
+            callback=self._audio_callback,
+        )
+
+    def _audio_callback(self, indata: np.ndarray, frames: int, time_info, status) -> None:
+        """Write captured audio into the ring buffer."""
+        if status:
+            _log.warning(f"[{self.device}] {status}")
+        self.buffer.write(indata[:, 0])
+
+    def finished_utterances(self) -> list[np.ndarray]:
+        """Return copies of the audio of utterances that ended since the last call."""
+        new_audio = self.buffer.read_since(self._vad_position)
+        self._vad_position += len(new_audio)
+        finished = []
+        for event in self.vad.process(new_audio):
+            if event.type == VadEventType.START:
+                self._utterance_start = event.position
+            elif self._utterance_start is not None:
+                audio = self.buffer.read_since(self._utterance_start)
+                finished.append(audio[:event.position - self._utterance_start])
+                self._utterance_start = None
+        return finished
+
+
+class Transcriber:
+    """
+    Captures from several microphones in one process.
+
+    All devices share a single loaded whisper.cpp model, used by a worker pool.
+    The model is not reentrant, so transcriptions are serialized on it; extra
+    workers only overlap the bookkeeping. Near identical utterances heard on
+    different devices within dedupe_window_ms are only delivered once.
+    """
+
+    def __init__(self, config: Box):
+        """Load the shared model and set up a listener per device."""
+        multi_config = config.speech_to_text.multi_device
+        self.engine = whisper_cpp.Transcriber(config)
+        self.dedupe_window = multi_config.dedupe_window_ms / 1000
+        self.dedupe_similarity = multi_config.dedupe_similarity
+        self.utterances = UtteranceQueue.from_config(config)
+        self.on_partial = None # partial hypotheses are not supported
+        self.listeners = [
+            DeviceListener(device=device, capacity=self.engine.length_samples, config=config)
+            for device in multi_config.capture_devices
+        ]
+        self._pool = ThreadPoolExecutor(max_workers=multi_config.workers)
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._recent: deque[tuple[float, int | str, str]] = deque() # (end of speech, device, text)
+
+    def transcribe(self, audio: np.ndarray, offset: float = 0.0) -> list[Segment]:
+        """Transcribe float32 audio with the shared model."""
+        with self._model_lock:
+            return self.engine.transcribe(audio, offset=offset)
+
+    def start(self) -> UtteranceQueue:
+        """Start capturing from all devices, return queue of finished utterances."""
+        for listener in self.listeners:
+            listener.stream.start()
+        threading.Thread(target=self._poll_forever, daemon=True).start()
+        return self.utterances
+
+    def _poll_forever(self) -> None:
+        """Hand finished utterances from every device to the worker pool, closing the queue on failure."""
+        try:
+            while True:
+                time.sleep(whisper_cpp.POLL_INTERVAL)
+                for listener in self.listeners:
+                    for audio in listener.finished_utterances():
+                        with self._stats_lock:
+                            listener.stats.queue_depth += 1
+                        self._pool.submit(self._handle_utterance, listener, audio, time.monotonic())
+        except Exception:
+            _log.exception("Polling capture devices failed, no more utterances will be heard.")
+        finally:
+            self.utterances.close()
+
+    def _handle_utterance(self, listener: DeviceListener, audio: np.ndarray, ended_at: float) -> None:
+        """Transcribe, dedupe and enqueue one utterance."""
+        try:
+            detector = self.engine.wake_word_detector
+            segments, text = [], ""
+            if detector is None or detector.detect(audio):
+                segments = self.transcribe(audio)
+                text = " ".join(segment.text for segment in segments)
+            if text and not self._is_duplicate(listener, text, ended_at):
+                self.utterances.put(Utterance(text=text, segments=segments, device=listener.device))
+        except Exception:
+            _log.exception(f"[{listener.device}] Failed to transcribe utterance.")
+        finally:
+            with self._stats_lock:
+                stats = listener.stats
+                stats.queue_depth -= 1
+                stats.latencies.append(time.monotonic() - ended_at)
+            _log.info(
+                f"[{listener.device}] queue depth {stats.queue_depth}, "
+                f"mean latency {stats.mean_latency:.2f} s, {stats.n_duplicates} duplicates"
+            )
+
+    def _is_duplicate(self, listener: DeviceListener, text: str, ended_at: float) -> bool:
+        """Check if another device recently heard the same thing, remembering this utterance."""
+        normalized = text.lower().strip()
+        with self._stats_lock:
+            while self._recent and ended_at - self._recent[0][0] > self.dedupe_window:
+                self._recent.popleft()
+            duplicate = any(
+                device != listener.device
+                and abs(ended_at - heard_at) <= self.dedupe_window
+                and is_similar(normalized, other_text, self.dedupe_similarity)
+                for heard_at, device, other_text in self._recent
+            )
+            self._recent.append((ended_at, listener.device, normalized))
+            listener.stats.n_utterances += 1
+            if duplicate:
+                listener.stats.n_duplicates += 1
+                _log.info(f"[{listener.device}] Dropping '{text}', already heard on another device.")
+            return duplicate
+
+    def stats(self) -> dict[int | str, DeviceStats]:
+        """Per device queue depth, latency and duplicate counters."""
+        return {listener.device: listener.stats for listener in self.listeners}
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from enum import Enum
+from box import Box
+import numpy as np
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, pcm_to_float
+
+FRAME_LENGTH = 480 # 30 ms
+
+
+class VadEventType(Enum):
+    """Utterance boundary types."""
+
+    START = "start"
+    END = "end"
+
+
+@dataclass
+class VadEvent:
+    """Utterance boundary, position in samples since the detector was created."""
+
+    type: VadEventType
+    position: int
+
+
+class VoiceActivityDetector:
+    """
+    Energy and spectral flatness based voice activity detector for 16 kHz audio.
+
+    Frames are classified in batches with numpy. Speech must last min_speech_ms before
+    an utterance starts, and silence must last hangover_ms before it ends.
+    """
+
+    def __init__(self, config: Box):
+        """Initialize detector from config."""
+        vad_config = config.speech_to_text.vad
+        self.energy_thold_db = vad_config.energy_thold_db
+        self.flatness_thold = vad_config.flatness_thold
+        self.noise_adaptation = vad_config.noise_adaptation
+        self.min_speech_frames = max(vad_config.min_speech_ms * SAMPLE_RATE // 1000 // FRAME_LENGTH, 1)
+        self.hangover_frames = max(vad_config.hangover_ms * SAMPLE_RATE // 1000 // FRAME_LENGTH, 1)
+        self._window = np.hanning(FRAME_LENGTH).astype(np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all state."""
+        self.noise_floor_db = -60.0
+        self.in_speech = False
+        self._run = 0 # consecutive frames contradicting the current state
+        self._position = 0
+        self._remainder = np.empty(0, dtype=np.float32)
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Return a boolean speech mask for a (n_frames, FRAME_LENGTH) float array."""
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-10
+        # Geometric over arithmetic mean, close to 1 for noise and low for voiced speech.
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        speech = (energy_db > self.noise_floor_db + self.energy_thold_db) & (flatness < self.flatness_thold)
+
+        # Track the noise floor on non speech frames only, so speech does not raise it.
+        if np.any(~speech):
+            quiet_db = np.mean(energy_db[~speech])
+            self.noise_floor_db += self.noise_adaptation * (quiet_db - self.noise_floor_db)
+        return speech
+
+    def process(self, pcm: np.ndarray) -> list[VadEvent]:
+        """Feed int16 or float audio of any length, return the utterance boundaries it contains."""
+        if pcm.dtype == np.int16:
+            pcm = pcm_to_float(pcm)
+        pcm = np.concatenate([self._remainder, pcm]) if len(self._remainder) else pcm
+        n_frames = len(pcm) // FRAME_LENGTH
+        self._remainder = pcm[n_frames * FRAME_LENGTH:].copy()
+        if n_frames == 0:
+            return []
+
+        speech = self.classify(pcm[:n_frames * FRAME_LENGTH].reshape(n_frames, FRAME_LENGTH))
+        events = []
+        # Only the hangover state machine runs per frame, the heavy lifting is batched above.
+        for i, is_speech in enumerate(speech):
+            self._run = self._run + 1 if is_speech != self.in_speech else 0
+            if not self.in_speech and self._run >= self.min_speech_frames:
+                self.in_speech = True
+                position = self._position + (i + 1 - self._run) * FRAME_LENGTH
+                events.append(VadEvent(type=VadEventType.START, position=position))
+                self._run = 0
+            elif self.in_speech and self._run >= self.hangover_frames:
+                self.in_speech = False
+                position = self._position + (i + 1 - self._run) * FRAME_LENGTH
+                events.append(VadEvent(type=VadEventType.END, position=position))
+                self._run = 0
+        self._position += n_frames * FRAME_LENGTH
+        return events
@@ -0,0 +1,144 @@
+import glob
+import logging
+import os
+from box import Box
+import numpy as np
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, read_wav
+
+_log = logging.getLogger(__name__)
+
+FRAME_LENGTH = 400 # 25 ms
+HOP_LENGTH = 160 # 10 ms
+N_FFT = 512
+N_MELS = 20
+MIN_DB = -50.0 # frames quieter than this (dBFS) are treated as silence
+
+
+def mel_filterbank(n_mels: int = N_MELS, n_fft: int = N_FFT, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Triangular mel filterbank of shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    filterbank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for i in range(1, n_mels + 1):
+        left, center, right = bins[i - 1], bins[i], bins[i + 1]
+        filterbank[i - 1, left:center] = (np.arange(left, center) - left) / max(center - left, 1)
+        filterbank[i - 1, center:right] = (right - np.arange(center, right)) / max(right - center, 1)
+    return filterbank
+
+
+_FILTERBANK = mel_filterbank()
+_WINDOW = np.hanning(FRAME_LENGTH).astype(np.float32)
+
+
+def frame_signal(pcm: np.ndarray) -> np.ndarray:
+    """Split PCM into overlapping frames without copying."""
+    if len(pcm) < FRAME_LENGTH:
+        return np.empty((0, FRAME_LENGTH), dtype=pcm.dtype)
+    return np.lib.stride_tricks.sliding_window_view(pcm, FRAME_LENGTH)[::HOP_LENGTH]
+
+
+def log_mel_features(pcm: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return (log-mel features normalized per frame, frame energy in dBFS) for int16 or float PCM."""
+    frames = frame_signal(pcm).astype(np.float32)
+    if pcm.dtype == np.int16:
+        frames /= 32768.0
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    spectrum = np.abs(np.fft.rfft(frames * _WINDOW, n=N_FFT)) ** 2
+    features = np.log(spectrum @ _FILTERBANK.T + 1e-6)
+    # Normalize each frame so that only spectral shape, not loudness, is compared.
+    features -= features.mean(axis=1, keepdims=True)
+    return features, energy_db
+
+
+def trim_silence(features: np.ndarray, energy_db: np.ndarray) -> np.ndarray:
+    """Drop leading and trailing silent frames."""
+    voiced = np.flatnonzero(energy_db > MIN_DB)
+    if len(voiced) == 0:
+        return features[:0]
+    return features[voiced[0]:voiced[-1] + 1]
+
+
+def subsequence_dtw(query: np.ndarray, template: np.ndarray) -> float:
+    """
+    Best length normalized DTW distance of the template against any part of the query.
+
+    Uses the (1, 1), (1, 2), (2, 1) step pattern so that each query row can be
+    computed with vectorized numpy operations.
+    """
+    n, m = len(query), len(template)
+    if n == 0 or m == 0:
+        return np.inf
+    cost = np.sqrt(
+        np.maximum(
+            (query ** 2).sum(axis=1)[:, None]
+            + (template ** 2).sum(axis=1)[None, :]
+            - 2 * query @ template.T,
+            0.0,
+        )
+    )
+    cumulative = np.full((n, m), np.inf, dtype=np.float32)
+    cumulative[:, 0] = cost[:, 0] # the template may start anywhere in the query
+    for i in range(1, n):
+        best = cumulative[i - 1, :-1].copy()
+        best[1:] = np.minimum(best[1:], cumulative[i - 1, :-2])
+        if i > 1:
+            best = np.minimum(best, cumulative[i - 2, :-1])
+        cumulative[i, 1:] = cost[i, 1:] + best
+    return float(cumulative[:, -1].min() / m)
+
+
+class WakeWordDetector:
+    """
+    Cheap template matching keyword spotter that runs on raw PCM.
+
+    Templates are short 16 kHz mono recordings of the wake word. Incoming audio is
+    compared against them using log-mel features and DTW, so that Whisper only has
+    to run once the wake word has been heard.
+    """
+
+    def __init__(self, config: Box):
+        """Load wake word templates from config."""
+        gate_config = config.speech_to_text.wake_word_gate
+        self.sensitivity = gate_config.sensitivity
+        self.search_frames = int(gate_config.search_seconds * SAMPLE_RATE / HOP_LENGTH)
+        self.templates = [
+            trim_silence(*log_mel_features(read_wav(path)))
+            for path in sorted(glob.glob(os.path.join(gate_config.templates_dir, "*.wav")))
+        ]
+        self.templates = [template for template in self.templates if len(template)]
+        if not self.templates:
+            raise ValueError(f"No wake word templates found in {gate_config.templates_dir}.")
+        self.reference_distance = self._reference_distance(default=gate_config.reference_distance)
+        self.max_distance = self.reference_distance * (1 + self.sensitivity)
+        _log.info(
+            f"Loaded {len(self.templates)} wake word templates, "
+            f"accepting distances below {self.max_distance:.2f}."
+        )
+
+    def _reference_distance(self, default: float) -> float:
+        """Mean distance between the templates themselves, used to calibrate the threshold."""
+        distances = [
+            subsequence_dtw(query, template)
+            for i, query in enumerate(self.templates)
+            for j, template in enumerate(self.templates)
+            if i != j
+        ]
+        return float(np.mean(distances)) if distances else default
+
+    def score(self, pcm: np.ndarray) -> float:
+        """Return the smallest distance between the start of the speech and any template."""
+        features = trim_silence(*log_mel_features(pcm))[:self.search_frames]
+        if len(features) == 0:
+            return np.inf
+        return min(subsequence_dtw(features, template) for template in self.templates)
+
+    def detect(self, pcm: np.ndarray) -> bool:
+        """Check if the audio starts with the wake word."""
+        return self.score(pcm) <= self.max_distance
@@ -0,0 +1,205 @@
+from typing import Callable, Generator
+from box import Box
+import logging
+import os
+import threading
+import time
+import numpy as np
+from pywhispercpp.model import Model
+import sounddevice as sd
+
+from assistant.metrics import timed_function
+from assistant.speech_to_text.audio import SAMPLE_RATE, RingBuffer
+from assistant.speech_to_text.events import Segment, Utterance, UtteranceQueue
+from assistant.speech_to_text.vad import VadEventType, VoiceActivityDetector
+from assistant.speech_to_text.wake_word import WakeWordDetector
+
+_log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1 # seconds between voice activity checks, same as whisper.cpp stream
+VAD_WINDOW_MS = 2000
+VAD_LAST_MS = 1000
+
+
+def speech_ended(audio: np.ndarray, vad_thold: float, last_ms: int = VAD_LAST_MS) -> bool:
+    """
+    Port of whisper.cpp's vad_simple.
+
+    Speech is considered finished when the last part of the window is
+    quiet compared to the window as a whole.
+    """
+    n_samples_last = SAMPLE_RATE * last_ms // 1000
+    if n_samples_last >= len(audio):
+        return False
+    magnitude = np.abs(audio - audio.mean()) # remove DC instead of whisper.cpp's high pass filter
+    energy_all = magnitude.mean()
+    energy_last = magnitude[-n_samples_last:].mean()
+    return energy_last <= vad_thold * energy_all
+
+
+class Transcriber:
+    """Whisper CPP model loaded in-process through pywhispercpp, fed with audio we capture ourselves."""
+
+    def __init__(self, config: Box):
+        """Load ggml model and allocate audio buffers."""
+        cpp_config = config.speech_to_text.whisper_cpp
+        self.capture_device = cpp_config.capture_device
+        self.vad_thold = cpp_config.vad_thold
+        self.length_samples = SAMPLE_RATE * cpp_config.length // 1000
+        self.buffer = RingBuffer(capacity=self.length_samples)
+        self._window = np.empty(self.length_samples, dtype=np.float32)
+        self._vad_window = np.empty(SAMPLE_RATE * VAD_WINDOW_MS // 1000, dtype=np.float32)
+
+        self.model = Model(
+            os.path.join(cpp_config.model_dir, f"ggml-{config.speech_to_text.whisper_model}.bin"),
+            n_threads=cpp_config.n_threads,
+            audio_ctx=cpp_config.audio_context_len,
+            language=config.language,
+            print_progress=False,
+            print_realtime=False,
+        )
+        self.wake_word_detector = (
+            WakeWordDetector(config)
+            if config.speech_to_text.wake_word_gate.enabled
+            else None
+        )
+        self.utterances = UtteranceQueue.from_config(config)
+        self.vad = (
+            VoiceActivityDetector(config)
+            if config.speech_to_text.vad.enabled
+            else None
+        )
+        self._vad_position = 0
+        self._utterance_start = None
+        self._pending_start = 0
+
+        # Partial hypotheses of the utterance in progress, only produced when someone listens.
+        # They are decoded on their own thread, so audio keeps being captured and checked for
+        # the end of the utterance meanwhile. A final decode waits for at most one partial.
+        self.on_partial: Callable[[str], None] | None = None
+        self.partial_interval = config.speech_to_text.speculation.partial_interval_ms / 1000
+        self._last_partial = 0.0
+        self._partial_window = np.empty(self.length_samples, dtype=np.float32)
+        self._partial_requested = threading.Event()
+        self._partial_thread: threading.Thread | None = None
+        self._model_lock = threading.Lock() # a whisper.cpp context decodes one audio at a time
+
+    @timed_function("transcribe")
+    def transcribe(self, audio: np.ndarray, offset: float = 0.0) -> list[Segment]:
+        """Transcribe float32 audio, offset is added to segment timestamps."""
+        with self._model_lock:
+            segments = self.model.transcribe(audio, extract_probability=True)
+        return [
+            Segment(
+                text=segment.text,
+                start=offset + segment.t0 / 100, # whisper.cpp timestamps are in 10 ms units
+                end=offset + segment.t1 / 100,
+                confidence=segment.probability,
+            )
+            for segment in segments
+            if segment.text
+        ]
+
+    def _audio_callback(self, indata: np.ndarray, frames: int, time_info, status) -> None:
+        """Write captured audio into the ring buffer."""
+        if status:
+            _log.warning(status)
+        self.buffer.write(indata[:, 0])
+
+    def segments(self) -> Generator[list[Segment], None, None]:
+        """Capture audio and yield the segments of every finished utterance."""
+        with sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+            device=self.capture_device,
+            callback=self._audio_callback,
+        ):
+            while True:
+                time.sleep(POLL_INTERVAL)
+                for start_position, end_position in self._finished_utterances():
+                    audio = self.buffer.read_since(start_position, out=self._window)
+                    audio = audio[:end_position - start_position]
+                    if self.wake_word_detector and not self.wake_word_detector.detect(audio):
+                        continue
+                    segments = self.transcribe(
+                        audio=audio,
+                        offset=start_position / SAMPLE_RATE,
+                    )
+                    if segments:
+                        yield segments
+                self._emit_partial()
+
+    def _emit_partial(self) -> None:
+        """Ask for the utterance in progress to be decoded for on_partial. Requires vad."""
+        if (
+            self.on_partial is None
+            or self._utterance_start is None
+            or time.monotonic() - self._last_partial < self.partial_interval
+        ):
+            return
+        self._last_partial = time.monotonic()
+        if self._partial_thread is None:
+            self._partial_thread = threading.Thread(target=self._decode_partials, daemon=True)
+            self._partial_thread.start()
+        self._partial_requested.set()
+
+    def _decode_partials(self) -> None:
+        """
+        Decode the utterance in progress whenever asked, and pass the text to on_partial.
+
+        Requests made while a decode is running are merged into one, and the text is
+        dropped if the utterance finished before its partial was decoded.
+        """
+        while True:
+            self._partial_requested.wait()
+            self._partial_requested.clear()
+            start_position = self._utterance_start
+            if start_position is None:
+                continue
+            audio = self.buffer.read_since(start_position, out=self._partial_window)
+            text = " ".join(segment.text for segment in self.transcribe(audio))
+            if text and self._utterance_start == start_position:
+                self.on_partial(text)
+
+    def _finished_utterances(self) -> list[tuple[int, int]]:
+        """Return (start, end) sample positions of utterances that ended since the last call."""
+        if self.vad is None:
+            # Like whisper.cpp stream, only audio that has not been transcribed yet is considered.
+            end_position = self.buffer.total_written
+            start_position = max(self._pending_start, end_position - self.buffer.capacity)
+            if end_position - start_position < len(self._vad_window):
+                return []
+            recent = self.buffer.read_last(len(self._vad_window), out=self._vad_window)
+            if not speech_ended(recent, self.vad_thold):
+                return []
+            self._pending_start = end_position
+            return [(start_position, end_position)]
+
+        new_audio = self.buffer.read_since(self._vad_position)
+        self._vad_position += len(new_audio)
+        finished = []
+        for event in self.vad.process(new_audio):
+            if event.type == VadEventType.START:
+                self._utterance_start = event.position
+            elif self._utterance_start is not None:
+                finished.append((self._utterance_start, event.position))
+                self._utterance_start = None
+        return finished
+
+    def start(self) -> UtteranceQueue:
+        """Start transcription in a background thread, return queue of finished utterances."""
+        threading.Thread(target=self._transcribe_forever, daemon=True).start()
+        return self.utterances
+
+    def _transcribe_forever(self) -> None:
+        """Put every transcribed utterance in the queue, closing it if transcription fails."""
+        try:
+            for segments in self.segments():
+                text = " ".join(segment.text for segment in segments)
+                _log.info(f"Got sentence {text}")
+                self.utterances.put(Utterance(text=text, segments=segments))
+        except Exception:
+            _log.exception("Transcription failed, no more utterances will be heard.")
+        finally:
+            self.utterances.close()
@@ -1,31 +1,89 @@
 from box import Box
-from queue import Queue
+import logging
+import threading
+import time
 import numpy as np
 import torch
 import whisper
-import time
 import speech_recognition as sr
 
+from assistant.metrics import timed_function
+from assistant.speech_to_text.audio import SAMPLE_RATE, RingBuffer
+from assistant.speech_to_text.events import Segment, Utterance, UtteranceQueue
+from assistant.speech_to_text.wake_word import WakeWordDetector
+
+_log = logging.getLogger(__name__)
+
 
 class Transcriber():
     """Transcriber class"""
 
     def __init__(self, config: Box):
-        self.phrase_time = None
-        self.data_queue = Queue()
-        self.recorder = sr.Recognizer()
-        self.recorder.energy_threshold = config.speech_to_text.energy_threshold
-        self.recorder.dynamic_energy_threshold = False
-    
-        self.source = sr.Microphone(device_index=0, sample_rate=16000)
-
-
+        py_config = config.speech_to_text.whisper_py
+        self.energy_threshold = py_config.energy_threshold
         self.audio_model = whisper.load_model(config.speech_to_text.whisper_model)
 
-        self.record_timeout = config.speech_to_text.record_timeout # how "real time" the recording is.
-        self.transcription = ['']
+        self.record_timeout = py_config.record_timeout # how "real time" the recording is.
+        self.phrase_timeout = py_config.phrase_timeout # silence before a phrase is considered complete.
         self.language = config.language
+        self.wake_word_detector = (
+            WakeWordDetector(config)
+            if config.speech_to_text.wake_word_gate.enabled
+            else None
+        )
+        self.utterances = UtteranceQueue.from_config(config)
+        self.on_partial = None # called with the current phrase every time it is re-decoded
 
+        # Audio is written in place into a fixed size buffer, and decoded with a sliding
+        # window starting at the current phrase, capped at the buffer size.
+        window_samples = int(py_config.window_seconds * SAMPLE_RATE)
+        self.buffer = RingBuffer(capacity=window_samples)
+        self._window = np.empty(window_samples, dtype=np.float32)
+        self._new_audio = threading.Event()
+        self._phrase_start = 0
+        self._decoded_until = 0
+        self._context = "" # text of the previous phrase, passed on as prompt to whisper
+        self._gate_open = False # the current phrase started with the wake word
+        self._last_chunk = 0.0 # monotonic time of the last chunk let through the gate
+
+    def get_transcription(self, timeout: float | None = None) -> str | None:
+        """Wait for new audio and return the transcription of the current phrase so far."""
+        if not self._new_audio.wait(timeout):
+            return None
+        self._new_audio.clear()
+        self._decoded_until = self.buffer.total_written
+        audio_np = self.buffer.read_since(self._phrase_start, out=self._window)
+
+        segments = self.transcribe(audio_np, initial_prompt=self._context or None)
+        return " ".join(segment.text for segment in segments)
+
+    @timed_function("transcribe")
+    def transcribe(self, audio: np.ndarray, offset: float = 0.0, initial_prompt: str | None = None) -> list[Segment]:
+        """Transcribe float32 audio, offset is added to segment timestamps."""
+        result = self.audio_model.transcribe(
+            audio,
+            fp16=torch.cuda.is_available(),
+            language=self.language,
+            initial_prompt=initial_prompt,
+        )
+        return [
+            Segment(
+                text=segment["text"].strip(),
+                start=offset + segment["start"],
+                end=offset + segment["end"],
+                confidence=float(np.exp(segment["avg_logprob"])),
+            )
+            for segment in result["segments"]
+            if segment["text"].strip()
+        ]
+
+    def start(self) -> UtteranceQueue:
+        """Start recording and transcription in the background, return queue of finished utterances."""
+        self.recorder = sr.Recognizer()
+        self.recorder.energy_threshold = self.energy_threshold
+        self.recorder.dynamic_energy_threshold = False
+
+        self.source = sr.Microphone(device_index=0, sample_rate=SAMPLE_RATE)
         with self.source:
             self.recorder.adjust_for_ambient_noise(self.source)
 
@@ -34,27 +92,48 @@ class Transcriber():
             Threaded callback function to receive audio data when recordings finish.
             audio: An AudioData containing the recorded bytes.
             """
-            # Grab the raw bytes and push it into the thread safe queue.
-            data = audio.get_raw_data()
-            self.data_queue.put(data)
+            pcm = np.frombuffer(audio.get_raw_data(), dtype=np.int16)
+            # Only hand the phrase to Whisper if it starts with the wake word. Chunks are
+            # at most record_timeout long, so once the gate is open the rest of the phrase
+            # passes through until phrase_timeout seconds go by without a new chunk.
+            if self.wake_word_detector:
+                now = time.monotonic()
+                if self._gate_open and now - self._last_chunk > self.phrase_timeout:
+                    self._gate_open = False
+                if not self._gate_open:
+                    self._gate_open = self.wake_word_detector.detect(pcm)
+                if not self._gate_open:
+                    return
+                self._last_chunk = now
+            self.buffer.write(pcm)
+            self._new_audio.set()
 
         self.recorder.listen_in_background(self.source, record_callback, phrase_time_limit=self.record_timeout)
+        threading.Thread(target=self._transcribe_forever, daemon=True).start()
+        return self.utterances
+
+    def _transcribe_forever(self) -> None:
+        """
+        Put every phrase in the queue once no new audio has arrived for phrase_timeout seconds.
 
-    def get_transcription(self) -> str | None:
-        if not self.data_queue.empty():
-            audio_data = b''.join(self.data_queue.queue)
-            self.data_queue.queue.clear()
-            
-            # Convert in-ram buffer to something the model can use directly without needing a temp file.
-            # Convert data from 16 bit wide integers to floating point with a width of 32 bits.
-            # Clamp the audio stream frequency to a PCM wavelength compatible default of 32768hz max.
-            audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-
-            # Read the transcription.
-            result = self.audio_model.transcribe(audio_np, fp16=torch.cuda.is_available(), language=self.language)
-            text = result['text'].strip()
-            return text
-            
-        time.sleep(0.25)    
-        return None
-            
\ No newline at end of file
+        The queue is closed if transcription fails.
+        """
+        text = ""
+        try:
+            while True:
+                transcription = self.get_transcription(timeout=self.phrase_timeout)
+                if transcription is not None:
+                    text = transcription
+                    if self.on_partial and text:
+                        self.on_partial(text)
+                    continue
+                if text:
+                    _log.info(f"Got sentence {text}")
+                    self.utterances.put(Utterance(text=text))
+                    self._context = text
+                    self._phrase_start = self._decoded_until
+                    text = ""
+        except Exception:
+            _log.exception("Transcription failed, no more utterances will be heard.")
+        finally:
+            self.utterances.close()
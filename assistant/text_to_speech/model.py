@@ -1,12 +1,19 @@
 from box import Box
+from concurrent.futures import Future, ThreadPoolExecutor
 import urllib.request 
 import os
 import logging
 import tarfile
 import subprocess
+import time
+from typing import Iterable
+
+from assistant.metrics import REGISTRY, timed_function
 
 _log = logging.getLogger(__name__)
 
+SAMPLE_RATE = 22050 # piper output sample rate
+
 class TTS:
     def __init__(
         self,
@@ -17,6 +24,8 @@ class TTS:
             self.piper_bin_path, 
             self.piper_model_path
         ) = self._try_install_piper(config)
+        # One player, so audio played in the background never overlaps and plays in order.
+        self._player = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
 
         _log.info("Initialized TTS model.")
     def _try_install_piper(self, config: Box):
@@ -75,24 +84,33 @@ class TTS:
 
         return piper_bin_path, piper_model_path
     
+    def raw_audio_command(self, text: str) -> str:
+        """Shell command writing raw 16 bit mono audio at SAMPLE_RATE to stdout."""
+        return f"echo '{text}' | {self.raw_audio_stream_command()}"
+
+    def raw_audio_stream_command(self) -> str:
+        """Shell command synthesizing every line on stdin to raw audio on stdout as it arrives."""
+        return (
+            f"{self.piper_bin_path} "
+            f"--model '{self.piper_model_path}' "
+            f"--output_raw"
+        )
+
+    def player_command(self, config: Box) -> str:
+        """Shell command playing raw audio from stdin on the speakers."""
+        if "linux" in config.platform:
+            return f"aplay -r {SAMPLE_RATE} -f S16_LE -t raw -"
+        elif "mac" in config.platform:
+            return f"play -t raw -b 16 -e signed -r {SAMPLE_RATE} -"
+
+    @timed_function("tts")
     def stream_audio(
         self,
         text: str,
         config: Box
     ) -> None:
         """Stream to connected speakers."""
-        if "linux" in config.platform:
-            command = (
-                f"echo '{text}' | {self.piper_bin_path} "
-                f"--model '{self.piper_model_path}' "
-                f"--output_raw | aplay -r 22050 -f S16_LE -t raw -"
-            )
-        elif "mac" in config.platform:
-            command = (
-                f"echo '{text}' | {self.piper_bin_path} "
-                f"--model '{self.piper_model_path}' "
-                f"--output_raw | play -t raw -b 16 -e signed -r 22050 -"
-            )
+        command = f"{self.raw_audio_command(text)} | {self.player_command(config)}"
 
         _log.info(command)
         process = subprocess.Popen(
@@ -106,6 +124,64 @@ class TTS:
         if errors:
             _log.warning(errors)
 
+    def speak_in_background(
+        self,
+        text: str,
+        config: Box,
+    ) -> Future:
+        """Queue text to be streamed to the speakers, the future holds the seconds it took to play."""
+        def play() -> float:
+            start = time.perf_counter()
+            self.stream_audio(text=text, config=config)
+            return time.perf_counter() - start
+        return self._player.submit(play)
+
+    def stream_sentences(
+        self,
+        sentences: Iterable[str],
+        config: Box,
+    ) -> str:
+        """
+        Stream sentences to connected speakers as they arrive, return the full text.
+
+        A single piper process synthesizes one line at a time, so the first sentence is
+        played while the following ones are still being generated.
+        """
+        command = f"{self.raw_audio_stream_command()} | {self.player_command(config)}"
+        _log.info(command)
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        spoken = []
+        seconds = 0.0 # spent on piper, not on waiting for the sentences to be generated
+        error = False
+        try:
+            for sentence in sentences:
+                _log.info(f"Speaking '{sentence}'")
+                spoken.append(sentence)
+                start = time.perf_counter()
+                try:
+                    process.stdin.write((" ".join(sentence.split()) + "\n").encode("utf8"))
+                    process.stdin.flush()
+                finally:
+                    seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            output, errors = process.communicate()
+            seconds += time.perf_counter() - start
+        except OSError:
+            error = True
+            raise
+        finally:
+            REGISTRY.observe("tts_stream", seconds, error=error)
+        _log.info(output)
+        if errors:
+            _log.warning(errors)
+        return " ".join(spoken)
+
     def create_wav(
         self,
         text: str,
@@ -0,0 +1,96 @@
+import queue
+import re
+import threading
+import time
+from typing import Iterable, Iterator
+
+SENTENCE_END = re.compile(r"[.!?:;]\s+|\n+")
+MIN_SENTENCE_CHARS = 20 # shorter sentences are merged with the next
+# Abbreviations that are followed by more of the same sentence, so their period does not end it.
+# Ones that usually end a sentence, like "osv." and "m.m.", are left out.
+ABBREVIATIONS = {
+    "t.ex.", "bl.a.", "dvs.", "d.v.s.", "ca.", "s.k.", "p.g.a.", "pga.", "t.o.m.", "fr.o.m.",
+    "kl.", "nr.", "jfr.", "resp.", "ex.", "e.g.", "i.e.",
+}
+_DONE = object()
+
+
+def split_sentences(tokens: Iterable[str], min_chars: int = MIN_SENTENCE_CHARS) -> Iterator[str]:
+    """
+    Group streamed tokens into sentences, yielding each one as soon as it is complete.
+
+    A sentence ends at punctuation followed by whitespace, so "3.5" is never split and
+    the end of a sentence is only known when the next token arrives. A period after
+    one of the ABBREVIATIONS does not end a sentence.
+    """
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        position = min_chars
+        while match := SENTENCE_END.search(buffer, position):
+            if match.group().startswith(".") and is_abbreviation(buffer[:match.start() + 1]):
+                position = match.end()
+                continue
+            sentence, buffer = buffer[:match.end()].strip(), buffer[match.end():]
+            position = min_chars
+            yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def is_abbreviation(text: str) -> bool:
+    """Check if text ends with an abbreviation that does not end the sentence."""
+    words = text.split()
+    return bool(words) and words[-1].lstrip("(\"'").lower() in ABBREVIATIONS
+
+
+class Prefetch:
+    """
+    Consume items on a background thread from now on, and yield them as they arrive.
+
+    Lets the LLM generate an answer while something else is played, errors are raised
+    to the consumer. Closing stops the producer and closes items, e.g. to stop
+    generating an answer nobody will hear.
+    """
+
+    def __init__(self, items: Iterator[str]):
+        """Start consuming items."""
+        self.first_item_seconds: float | None = None # from now until the first item was ready
+        self._items = items
+        self._buffer = queue.Queue()
+        self._stop = threading.Event()
+        self._start = time.perf_counter()
+        threading.Thread(target=self._produce, daemon=True).start()
+
+    def _produce(self) -> None:
+        """Put items in the buffer until they run out, fail or the consumer stops."""
+        try:
+            for item in self._items:
+                if self.first_item_seconds is None:
+                    self.first_item_seconds = time.perf_counter() - self._start
+                if self._stop.is_set():
+                    break
+                self._buffer.put((item, None))
+        except Exception as e:
+            self._buffer.put((None, e))
+        finally:
+            if hasattr(self._items, "close"):
+                self._items.close()
+            self._buffer.put(_DONE)
+
+    def __iter__(self) -> "Prefetch":
+        return self
+
+    def __next__(self) -> str:
+        entry = self._buffer.get()
+        if entry is _DONE:
+            self._buffer.put(_DONE) # keep raising StopIteration
+            raise StopIteration
+        item, error = entry
+        if error:
+            raise error
+        return item
+
+    def close(self) -> None:
+        """Stop consuming items, the producer stops once the next one arrives."""
+        self._stop.set()
@@ -1,4 +1,6 @@
 from difflib import SequenceMatcher
+import re
+from box import Box
 
 def is_similar(sentence: str, sentence_to_compare_to: str, threshold: float) -> bool:
     """Simple similarity check between two sentence."""
@@ -9,4 +11,111 @@ def contains_wake_word(sentence: str, wake_word: str, threshold: float) -> bool:
     """Check if sentence begins with wake word."""
     wake_word_len = len(wake_word.split(" "))
     potential_wake_word = " ".join(sentence.split(" ")[:wake_word_len])
-    return is_similar(potential_wake_word, wake_word, threshold)
\ No newline at end of file
+    return is_similar(potential_wake_word, wake_word, threshold)
+
+
+# Spellings whisper tends to mix up, mostly Swedish/English differences.
+PHONETIC_REPLACEMENTS = [("sch", "sj"), ("ck", "k"), ("ph", "f"), ("qu", "kv"), ("x", "ks")]
+PHONETIC_LETTERS = str.maketrans({
+    "c": "k", "q": "k", "w": "v", "z": "s",
+    "é": "e", "è": "e", "ä": "e", "æ": "e",
+    "å": "o", "ö": "o", "ø": "o",
+    "ü": "i", "y": "i",
+})
+MIN_FUZZY_KEY_LENGTH = 5 # shorter keys only match exactly, "rik" should not match "erik"
+# Words that may come before the wake word. Anything else, like "Tack Erik", is talking to a person.
+GREETINGS = {"hej", "hey", "hi", "hallå", "hello", "okej", "ok", "okay"}
+_NON_WORD = re.compile(r"[^\w]")
+_DOUBLE_LETTERS = re.compile(r"(.)\1+")
+
+
+def phonetic_key(word: str) -> str:
+    """Reduce a word to a rough phonetic key, so that e.g. Erik, Eric and Ärik are equal."""
+    key = _NON_WORD.sub("", word.lower())
+    for old, new in PHONETIC_REPLACEMENTS:
+        key = key.replace(old, new)
+    key = key.translate(PHONETIC_LETTERS)
+    key = key[:1] + key[1:].replace("h", "") # silent h
+    return _DOUBLE_LETTERS.sub(r"\1", key)
+
+
+def deletions(key: str) -> set[str]:
+    """All variants of key with one letter removed."""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def substitutions(key: str) -> set[str]:
+    """All variants of key with one letter replaced by a wildcard."""
+    return {key[:i] + "?" + key[i + 1:] for i in range(len(key))}
+
+
+class WakeWordMatcher:
+    """
+    Phonetic matcher for several wake words and their aliases.
+
+    Keys for all wake words are precomputed, so matching is a handful of set
+    lookups per word. Keys of longer wake words also match with one letter added,
+    removed or changed. Per call it costs about as much as the SequenceMatcher
+    based contains_wake_word (15-20 µs at the start, 35-45 µs anywhere, see
+    scripts.wake_word_matcher_benchmark), but it accepts spelling variants and aliases.
+    """
+
+    def __init__(self, wake_words: list[str], anywhere: bool = False):
+        """Precompute keys. If anywhere is set, the wake word may appear mid-sentence."""
+        self.anywhere = anywhere
+        # All lookups are grouped by the number of words in the wake word.
+        self.keys: dict[int, set[str]] = {}
+        self.fuzzy_keys: dict[int, set[str]] = {} # keys long enough for fuzzy matching
+        self.deleted_keys: dict[int, set[str]] = {}
+        self.substituted_keys: dict[int, set[str]] = {}
+        for wake_word in wake_words:
+            words = wake_word.split()
+            key = " ".join(phonetic_key(word) for word in words)
+            self.keys.setdefault(len(words), set()).add(key)
+            if len(key) >= MIN_FUZZY_KEY_LENGTH:
+                self.fuzzy_keys.setdefault(len(words), set()).add(key)
+                self.deleted_keys.setdefault(len(words), set()).update(deletions(key))
+                self.substituted_keys.setdefault(len(words), set()).update(substitutions(key))
+        self.max_words = max(self.keys)
+
+    @classmethod
+    def from_config(cls, config: Box) -> "WakeWordMatcher":
+        """Create matcher for the configured wake word and aliases."""
+        speech_config = config.speech_to_text
+        return cls(
+            wake_words=[speech_config.wake_word] + list(speech_config.wake_word_aliases),
+            anywhere=speech_config.wake_word_anywhere,
+        )
+
+    def _matches_key(self, key: str, n_words: int) -> bool:
+        """Check a phonetic key of n_words words against all wake words."""
+        if key in self.keys.get(n_words, ()):
+            return True
+        if n_words not in self.fuzzy_keys or len(key) < MIN_FUZZY_KEY_LENGTH - 1:
+            return False
+        return (
+            key in self.deleted_keys[n_words] # a letter missing
+            or not deletions(key).isdisjoint(self.fuzzy_keys[n_words]) # an extra letter
+            or not substitutions(key).isdisjoint(self.substituted_keys[n_words]) # a letter changed
+        )
+
+    def matches(self, sentence: str) -> bool:
+        """
+        Check if the sentence contains a wake word (at the start, unless anywhere is set).
+
+        At the start means first, or second after one of the GREETINGS, so "Hej Erik"
+        matches but "Tack Erik" does not.
+        """
+        words = [word for word in sentence.split() if _NON_WORD.sub("", word)]
+        if not self.anywhere:
+            greeted = bool(words) and _NON_WORD.sub("", words[0].lower()) in GREETINGS
+            words = words[int(greeted):int(greeted) + self.max_words]
+        keys = [phonetic_key(word) for word in words]
+        keys = [key for key in keys if key]
+        starts = range(len(keys)) if self.anywhere else range(min(len(keys), 1))
+        return any(
+            self._matches_key(" ".join(keys[start:start + n_words]), n_words)
+            for start in starts
+            for n_words in self.keys
+            if start + n_words <= len(keys)
+        )
@@ -0,0 +1,74 @@
+"""
+Measure tail latency of the async LanguageModel with and without hedging.
+
+Sends requests with a fixed concurrency, first with hedging disabled and then
+enabled, and prints latency quantiles together with retry, hedge and deadline
+counters. Each run starts with unmeasured warm up requests, so that the latency
+window hedging is based on is filled. Meant to be run against scripts/fake_openai_server.py, but works with any
+OpenAI compatible base url.
+
+Usage: python -m scripts.async_llm_benchmark [base_url] [n_requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+from box import Box
+import numpy as np
+import yaml
+
+from assistant.language_model.async_model import AsyncLanguageModel
+
+BASE_URL = "http://127.0.0.1:8080/v1"
+
+
+async def run(config: Box, n_requests: int, concurrency: int) -> tuple[list[float], int, dict]:
+    """Send n_requests after warming up, return end to end latencies, failures and model stats."""
+    llm = AsyncLanguageModel(config)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = []
+
+    async def request(i: int, measure: bool):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm.answer_prompt(system_prompt=None, user_prompt=f"Fråga nummer {i}")
+            except Exception:
+                failures.append(i)
+                return
+            if measure:
+                latencies.append(time.perf_counter() - start)
+
+    n_warm_up = config.language_model.async_client.latency_window
+    await asyncio.gather(*(request(i, measure=False) for i in range(n_warm_up)))
+    failures.clear()
+    warm_up_stats = llm.stats()
+    await asyncio.gather(*(request(i, measure=True) for i in range(n_requests)))
+    await llm.close()
+    stats = {name: llm.stats()[name] - warm_up_stats[name] for name in ("retries", "hedges", "hedge_wins")}
+    return latencies, len(failures), stats
+
+
+def main(config: Box, n_requests: int, concurrency: int):
+    """Compare hedging off and on."""
+    print(f"{'hedging':<8} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} {'retries':>8} {'hedges':>7} {'wins':>5} {'failed':>7}")
+    for hedging in (False, True):
+        config.language_model.async_client.hedging.enabled = hedging
+        latencies, n_failed, stats = asyncio.run(run(config, n_requests, concurrency))
+        p50, p90, p99 = np.quantile(latencies, [0.5, 0.9, 0.99])
+        print(
+            f"{str(hedging):<8} {p50:>6.2f}s {p90:>6.2f}s {p99:>6.2f}s {max(latencies):>6.2f}s "
+            f"{stats['retries']:>8} {stats['hedges']:>7} {stats['hedge_wins']:>5} "
+            f"{n_failed:>7}"
+        )
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    config.language_model.base_url = sys.argv[1] if len(sys.argv) > 1 else BASE_URL
+    main(
+        config=config,
+        n_requests=int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+        concurrency=int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+    )
@@ -0,0 +1,104 @@
+"""
+Local OpenAI compatible chat completions server with configurable latency and errors.
+
+Answers every request by echoing the user message. Latency is log-normal around
+median_ms, a share of requests is slow (the tail) and a share fails with a 500, so
+retries, deadlines and hedging can be tested without the real API. Streaming
+requests are answered word by word as server sent events.
+
+Point language_model.base_url at http://127.0.0.1:<port>/v1 to use it.
+
+Usage: python -m scripts.fake_openai_server [port] [median_ms] [slow_share] [slow_ms] [error_share]
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import sys
+import time
+import uuid
+
+PORT = 8080
+MEDIAN_MS = 300
+SLOW_SHARE = 0.1
+SLOW_MS = 3000
+ERROR_SHARE = 0.02
+WORD_DELAY_SECONDS = 0.03
+
+
+class Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for hedged requests."""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handles POST /v1/chat/completions."""
+
+    protocol_version = "HTTP/1.1" # keep-alive, like the real API
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if random.random() < ERROR_SHARE:
+            return self._send_json(500, {"error": {"message": "Fake server error", "type": "server_error"}})
+        slow = random.random() < SLOW_SHARE
+        time.sleep((SLOW_MS if slow else MEDIAN_MS * random.lognormvariate(0, 0.25)) / 1000)
+
+        answer = "Du sa: " + body["messages"][-1]["content"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if not body.get("stream"):
+            return self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(answer.split(" ")):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(WORD_DELAY_SECONDS)
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    port = int(arguments[0]) if len(arguments) > 0 else PORT
+    MEDIAN_MS = float(arguments[1]) if len(arguments) > 1 else MEDIAN_MS
+    SLOW_SHARE = float(arguments[2]) if len(arguments) > 2 else SLOW_SHARE
+    SLOW_MS = float(arguments[3]) if len(arguments) > 3 else SLOW_MS
+    ERROR_SHARE = float(arguments[4]) if len(arguments) > 4 else ERROR_SHARE
+    print(f"Fake OpenAI server on http://127.0.0.1:{port}/v1")
+    Server(("127.0.0.1", port), Handler).serve_forever()
@@ -0,0 +1,101 @@
+"""
+Local SMHI pmp3g point forecast server with configurable latency.
+
+Serves a generated forecast for any point, with a new approvedTime every
+update_seconds. Responses carry an ETag and Last-Modified, conditional requests
+for the current forecast are answered with 304 Not Modified, like the real API.
+
+Set weather.url to http://127.0.0.1:<port>/api/category/pmp3g/version/2/geotype/point/lon/{lon}/lat/{lat}/data.json
+to use it.
+
+Usage: python -m scripts.fake_smhi_server [port] [median_ms] [update_seconds]
+"""
+import datetime
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import sys
+import time
+
+PORT = 8081
+MEDIAN_MS = 400
+UPDATE_SECONDS = 3600
+HOURS = 72
+
+
+def forecast(approved: datetime.datetime) -> dict:
+    """Forecast in the pmp3g format, one entry per hour, all parameters get_weather uses."""
+    generator = random.Random(approved.timestamp())
+    time_series = []
+    for hour in range(HOURS):
+        valid = approved + datetime.timedelta(hours=hour + 1)
+        values = {
+            "spp": -9, "pcat": generator.randint(0, 6), "pmin": 0.0, "pmean": generator.random(),
+            "pmax": 1.0, "pmedian": 0.0, "tcc_mean": generator.randint(0, 8), "lcc_mean": 0,
+            "mcc_mean": 0, "hcc_mean": 0, "t": round(generator.gauss(10, 5), 1), "msl": 1013.0,
+            "vis": 40.0, "wd": generator.randint(0, 359), "ws": round(generator.random() * 10, 1),
+            "r": generator.randint(40, 100), "tstm": 0, "gust": round(generator.random() * 15, 1),
+            "Wsymb2": generator.randint(1, 27),
+        }
+        time_series.append({
+            "validTime": valid.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "parameters": [
+                {"name": name, "levelType": "hl", "level": 2, "unit": "", "values": [value]}
+                for name, value in values.items()
+            ],
+        })
+    return {
+        "approvedTime": approved.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "referenceTime": approved.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "geometry": {"type": "Point", "coordinates": [[18.0686, 59.3293]]},
+        "timeSeries": time_series,
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handles GET of any point forecast."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(MEDIAN_MS * random.lognormvariate(0, 0.25) / 1000)
+        now = time.time()
+        approved = datetime.datetime.fromtimestamp(now - now % UPDATE_SECONDS, tz=datetime.timezone.utc)
+        etag = f'"{int(approved.timestamp())}"'
+        self.server.n_requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.server.n_not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = json.dumps(forecast(approved)).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", format_datetime(approved, usegmt=True))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    """Threaded server counting the requests it answers."""
+
+    daemon_threads = True
+    n_requests = 0
+    n_not_modified = 0
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    PORT = int(arguments[0]) if len(arguments) > 0 else PORT
+    MEDIAN_MS = float(arguments[1]) if len(arguments) > 1 else MEDIAN_MS
+    UPDATE_SECONDS = float(arguments[2]) if len(arguments) > 2 else UPDATE_SECONDS
+    print(f"Fake SMHI on http://127.0.0.1:{PORT}, median {MEDIAN_MS} ms, new forecast every {UPDATE_SECONDS} s")
+    Server(("127.0.0.1", PORT), Handler).serve_forever()
@@ -0,0 +1,81 @@
+"""
+Compare weather data latency with and without the forecast cache, against a fake SMHI.
+
+Starts scripts.fake_smhi_server in process and asks for the forecast at a fixed
+interval, directly as get_weather used to and through the ForecastCache. Time is
+compressed: the fake publishes a new forecast every update_seconds, and the cache
+keeps forecasts fresh for fresh_seconds and serves them stale for max_stale_seconds.
+Reports latency quantiles, the cache hit ratio and the requests SMHI had to answer.
+
+Usage: python -m scripts.forecast_cache_benchmark [questions] [interval_seconds] [median_ms]
+"""
+import sys
+import threading
+import time
+import numpy as np
+import requests
+
+from assistant.language_model.forecast_cache import ForecastCache
+from assistant.language_model.tools.get_weather import parse_forecast
+from scripts import fake_smhi_server
+
+QUESTIONS = 40
+INTERVAL_SECONDS = 0.5
+MEDIAN_MS = 400
+UPDATE_SECONDS = 6
+FRESH_SECONDS = 2
+MAX_STALE_SECONDS = 30
+LAT, LON = 59.3293, 18.0686
+
+
+def run(get, questions: int, interval: float) -> list[float]:
+    """Latency in seconds of getting the forecast questions times, interval seconds apart."""
+    latencies = []
+    for _ in range(questions):
+        start = time.perf_counter()
+        get()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def main(questions: int, interval: float, median_ms: float):
+    """Run both paths and print a table."""
+    fake_smhi_server.MEDIAN_MS = median_ms
+    fake_smhi_server.UPDATE_SECONDS = UPDATE_SECONDS
+    server = fake_smhi_server.Server(("127.0.0.1", 0), fake_smhi_server.Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = (
+        f"http://127.0.0.1:{server.server_address[1]}"
+        "/api/category/pmp3g/version/2/geotype/point/lon/{lon}/lat/{lat}/data.json"
+    )
+    cache = ForecastCache(
+        url=url,
+        parse=parse_forecast,
+        fresh_seconds=FRESH_SECONDS,
+        max_stale_seconds=MAX_STALE_SECONDS,
+        timeout_seconds=3,
+    )
+    paths = {
+        "direct": lambda: parse_forecast(requests.get(url.format(lat=LAT, lon=LON)).json()),
+        "cached": lambda: cache.get(LAT, LON),
+    }
+    print(f"{questions} questions {interval} s apart, SMHI median {median_ms:.0f} ms\n")
+    print(f"{'path':<8} {'p50':>9} {'p90':>9} {'max':>9} {'smhi requests':>14} {'304':>5}")
+    for name, get in paths.items():
+        server.n_requests = server.n_not_modified = 0
+        latencies = np.array(run(get, questions, interval)) * 1000
+        print(
+            f"{name:<8} {np.median(latencies):>6.1f} ms {np.quantile(latencies, 0.9):>6.1f} ms "
+            f"{latencies.max():>6.1f} ms {server.n_requests:>14} {server.n_not_modified:>5}"
+        )
+    print(f"\nCache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    main(
+        questions=int(arguments[0]) if len(arguments) > 0 else QUESTIONS,
+        interval=float(arguments[1]) if len(arguments) > 1 else INTERVAL_SECONDS,
+        median_ms=float(arguments[2]) if len(arguments) > 2 else MEDIAN_MS,
+    )
@@ -0,0 +1,162 @@
+"""
+Benchmark forecast ingestion: the previous row by row parsing against the columnar one.
+
+Parses an SMHI pmp3g point forecast payload repeatedly with both implementations,
+and loads it into DuckDB, reporting time per parse and peak traced memory. Also
+checks that both produce the same values. Record a payload with
+
+    curl -o smhi.json "https://opendata-download-metfcst.smhi.se/api/category/pmp3g/version/2/geotype/point/lon/18.0686/lat/59.3293/data.json"
+
+Without a payload, a forecast generated by scripts.fake_smhi_server is used.
+
+Usage: python -m scripts.forecast_ingestion_benchmark [payload.json] [repeats]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+import duckdb
+import pandas as pd
+
+from assistant.language_model.tools.get_weather import (
+    NAME_MAPPING,
+    PRECIPITATION_CATEGORIES,
+    WEATHER_SYMBOLS,
+    ZERO_TO_EIGHT_SCALE,
+    load_forecast,
+    parse_forecast,
+)
+from scripts import fake_smhi_server
+
+REPEATS = 50
+
+
+def legacy_parse_forecast(response: dict) -> pd.DataFrame:
+    """The previous get_weather_data after the download, row by row with apply and pivot."""
+    time_series = response["timeSeries"]
+
+    data = []
+    for entry in time_series:
+        for param in entry["parameters"]:
+            data.append(
+                {
+                    "time": entry["validTime"],
+                }
+                | param
+            )
+
+    df = pd.DataFrame(data)
+    df["values"] = df["values"].apply(lambda value_list: value_list[0])
+    df = df[
+        ~df.name.isin(
+            ["lcc_mean", "mcc_mean", "hcc_mean", "wd", "pmax", "pmin", "pmedian"]
+        )
+    ]
+    df["values"] = df[["name", "values"]].apply(
+        lambda data: legacy_map_value(name=data["name"], value=data["values"]),
+        axis=1,
+    )
+    df["name"] = df["name"].apply(lambda name: NAME_MAPPING[name])
+    weather = df.pivot(index="time", columns="name", values="values").reset_index()
+    datetimes = pd.to_datetime(weather["time"])
+    weather["date"] = datetimes.dt.date
+    weather["time"] = datetimes.dt.time
+
+    return weather
+
+
+def legacy_map_value(name: str, value: Any) -> Any:
+    """Map values to something more sensible based on name."""
+    match name:
+        case "spp":
+            return max(value, 0)
+        case "pcat":
+            value_cat = int(value)
+            return PRECIPITATION_CATEGORIES[value_cat]
+        case "pmin":
+            return value
+        case "pmean":
+            return value
+        case "pmax":
+            return value
+        case "pmedian":
+            return value
+        case "tcc_mean":
+            return ZERO_TO_EIGHT_SCALE[int(value)]
+        case "lcc_mean":
+            return ZERO_TO_EIGHT_SCALE[int(value)]
+        case "mcc_mean":
+            return ZERO_TO_EIGHT_SCALE[int(value)]
+        case "hcc_mean":
+            return ZERO_TO_EIGHT_SCALE[int(value)]
+        case "t":
+            return value
+        case "msl":
+            return value
+        case "vis":
+            return value
+        case "wd":
+            return value
+        case "ws":
+            return value
+        case "r":
+            return value
+        case "tstm":
+            return value
+        case "gust":
+            return value
+        case "Wsymb2":
+            return WEATHER_SYMBOLS[value]
+        case _:
+            raise ValueError()
+
+
+def assert_same(legacy: pd.DataFrame, columnar: pd.DataFrame) -> None:
+    """Check that both tables have the same columns and values, numbers now being floats."""
+    assert list(legacy.columns) == list(columnar.columns)
+    for column in legacy.columns:
+        if pd.api.types.is_float_dtype(columnar[column]):
+            pd.testing.assert_series_equal(legacy[column].astype(float), columnar[column], check_names=False)
+        else:
+            assert list(legacy[column].astype(str)) == list(columnar[column].astype(str)), column
+
+
+def measure(parse: Callable[[dict], Any], payload: dict, repeats: int) -> tuple[float, float]:
+    """Milliseconds per call and peak traced memory in MB of one call."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse(payload)
+    milliseconds = (time.perf_counter() - start) / repeats * 1000
+    tracemalloc.start()
+    parse(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return milliseconds, peak / 1024 ** 2
+
+
+def main(payload: dict, repeats: int):
+    """Compare implementations and print a table."""
+    print(f"{len(payload['timeSeries'])} forecast hours, {repeats} repeats\n")
+    assert_same(legacy_parse_forecast(payload), parse_forecast(payload))
+
+    connection = duckdb.connect()
+    paths = {
+        "apply + pivot": legacy_parse_forecast,
+        "columnar": parse_forecast,
+        "columnar to duckdb": lambda payload: load_forecast(payload, connection),
+    }
+    print(f"{'path':<20} {'time':>10} {'peak memory':>12}")
+    for name, parse in paths.items():
+        milliseconds, megabytes = measure(parse, payload, repeats)
+        print(f"{name:<20} {milliseconds:>7.2f} ms {megabytes:>9.2f} MB")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    if arguments:
+        with open(arguments[0], "r") as file:
+            payload = json.load(file)
+    else:
+        payload = fake_smhi_server.forecast(pd.Timestamp.now(tz="UTC").floor("h").to_pydatetime())
+    main(payload=payload, repeats=int(arguments[1]) if len(arguments) > 1 else REPEATS)
@@ -0,0 +1,70 @@
+"""
+Evaluate the local intent classifier on a labeled corpus that it was not trained on.
+
+The corpus is a tab separated file with an action name and a sentence. Utterances go
+through route, like in select_action, so compound commands are left to the LLM. For a
+range of thresholds, reports the routing accuracy on the utterances the classifier
+handles itself, the share of select_action calls that bypass the LLM, and the per
+utterance latency in microseconds.
+
+Usage: python -m scripts.intent_classifier_benchmark [corpus.tsv]
+"""
+import sys
+import time
+from box import Box
+import yaml
+
+from assistant.language_model.intent import IntentClassifier, load_labeled_file
+
+DEFAULT_CORPUS = "scripts/data/intent_corpus.tsv"
+THRESHOLDS = [0.0, 0.05, 0.1, 0.15, 0.2, 0.3]
+REPEATS = 200
+
+
+def main(corpus_path: str, config: Box):
+    """Train on the configured file, evaluate on the corpus and print a table."""
+    start = time.perf_counter()
+    classifier = IntentClassifier.from_config(config)
+    print(
+        f"Trained on {config.language_model.intent_classifier.training_file} in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms, {len(classifier.vocabulary)} n-grams"
+    )
+    corpus = load_labeled_file(corpus_path)
+    configured_threshold = classifier.threshold
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for _, sentence in corpus:
+            classifier.route(sentence)
+    per_utterance = (time.perf_counter() - start) / (REPEATS * len(corpus))
+    print(f"Corpus: {len(corpus)} utterances, {per_utterance * 1e6:.1f} µs per utterance\n")
+
+    print(f"{'threshold':>10} {'bypassed':>10} {'accuracy':>10}")
+    for threshold in THRESHOLDS:
+        classifier.threshold = threshold
+        routed = [
+            action == predicted
+            for action, sentence in corpus
+            if (predicted := classifier.route(sentence)) is not None
+        ]
+        marker = " (configured)" if threshold == configured_threshold else ""
+        print(
+            f"{threshold:>10.2f} {len(routed) / len(corpus):>10.1%} "
+            f"{sum(routed) / max(len(routed), 1):>10.1%}{marker}"
+        )
+    classifier.threshold = configured_threshold
+
+    print("\nMistakes above the configured threshold:")
+    for action, sentence in corpus:
+        predicted = classifier.route(sentence)
+        if predicted is not None and predicted != action:
+            confidence = classifier.predict(sentence)[1]
+            print(f"    {sentence}: {predicted.name} instead of {action.name} ({confidence:.2f})")
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(
+        corpus_path=sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS,
+        config=config,
+    )
@@ -0,0 +1,117 @@
+"""
+Replay a saved query set through several language model backends.
+
+Every query is routed by each backend, with select_action (action numbers) and with
+native tool calling (tool names, or answer for a direct answer), without running the
+chosen tools. Reports median and p90 latency per backend and how often it agrees with
+the first backend, which should be the reference (usually default, the cloud model).
+Agreement only counts queries that neither backend failed, failures are reported apart.
+The response cache, memory and intent classifier are disabled.
+
+The query set is a tab separated file with a sentence column, such as
+scripts/data/intent_corpus.tsv.
+
+Usage: python -m scripts.llm_replay [queries.tsv] [backend ...]
+"""
+import csv
+import datetime
+import sys
+import time
+from box import Box
+from dotenv import load_dotenv
+import numpy as np
+import yaml
+
+from assistant.language_model.action import tool_schemas, tools
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.tools import call_tools, select_action
+from assistant.language_model.utils import render_prompt
+
+DEFAULT_QUERIES = "scripts/data/intent_corpus.tsv"
+
+
+def route_select_action(llm: LanguageModel, query: str, config: Box) -> str:
+    """Action numbers chosen by select_action."""
+    answer = llm.answer_json(
+        system_prompt=render_prompt(prompt_name=select_action.NAME, actions=tools.describe()),
+        user_prompt=query,
+        schema=select_action.output_schema(),
+        tool=select_action.NAME,
+    )
+    if answer is None:
+        return "failed: invalid JSON"
+    return "+".join(str(action["action"]) for action in answer["actions"])
+
+
+def route_call_tools(llm: LanguageModel, query: str, config: Box) -> str:
+    """Tools chosen by native tool calling, answer if the model answered directly."""
+    message = llm.call_tools(
+        system_prompt=render_prompt(
+            prompt_name=call_tools.NAME,
+            current_datetime=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        ),
+        user_prompt=query,
+        tools=tool_schemas(config),
+        tool=call_tools.NAME,
+    )
+    if not message.tool_calls:
+        return "answer"
+    return "+".join(tool_call.function.name for tool_call in message.tool_calls)
+
+
+def replay(backend: str, queries: list[str], config: Box) -> dict[str, tuple[list, list]]:
+    """Route all queries with one backend, return decisions and latencies per task."""
+    config = Box(config.to_dict())
+    config.language_model.cache.enabled = False
+    config.language_model.memory.enabled = False
+    config.language_model.intent_classifier.enabled = False
+    config.language_model.tool_backends = {select_action.NAME: backend, call_tools.NAME: backend}
+    llm = LanguageModel(config)
+
+    results = {}
+    for task, route in (("select_action", route_select_action), ("call_tools", route_call_tools)):
+        decisions, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            try:
+                decisions.append(route(llm, query, config))
+            except Exception as e:
+                decisions.append(f"failed: {e.__class__.__name__}")
+            latencies.append(time.perf_counter() - start)
+        results[task] = (decisions, latencies)
+    return results
+
+
+def main(queries_path: str, backends: list[str], config: Box):
+    """Replay queries through every backend and print latency and agreement with the first."""
+    with open(queries_path, "r") as file:
+        queries = [row["sentence"] for row in csv.DictReader(file, delimiter="\t")]
+    print(f"{len(queries)} queries, reference backend {backends[0]}\n")
+    print(f"{'backend':<12} {'task':<14} {'median':>8} {'p90':>8} {'agreement':>10} {'failed':>7}")
+    reference = None
+    for backend in backends:
+        results = replay(backend, queries, config)
+        reference = reference or results
+        for task, (decisions, latencies) in results.items():
+            agreement = np.mean([
+                a == b
+                for a, b in zip(decisions, reference[task][0])
+                if not a.startswith("failed") and not b.startswith("failed")
+            ] or [np.nan])
+            n_failed = sum(decision.startswith("failed") for decision in decisions)
+            print(
+                f"{backend:<12} {task:<14} {np.median(latencies):>7.2f}s "
+                f"{np.quantile(latencies, 0.9):>7.2f}s {agreement:>10.1%} {n_failed:>7}"
+            )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    arguments = sys.argv[1:]
+    main(
+        queries_path=arguments[0] if arguments else DEFAULT_QUERIES,
+        backends=arguments[1:] or ["default", *(config.language_model.backends or {})],
+        config=config,
+    )
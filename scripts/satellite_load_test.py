@@ -0,0 +1,95 @@
+"""
+Simulate many satellites talking to a running satellite server at the same time.
+
+Every simulated satellite streams the same WAV file (16 kHz mono, should start with
+the wake word) in real time, followed by silence, and measures the time from the end
+of its speech until the first response audio and until the response is complete.
+
+Usage: python -m scripts.satellite_load_test path/to/command.wav [n_satellites] [host]
+"""
+import asyncio
+import sys
+import time
+from box import Box
+import numpy as np
+import yaml
+
+from assistant.satellite.protocol import MessageType, mu_law_encode, read_message, write_message
+from assistant.speech_to_text.audio import SAMPLE_RATE, read_wav
+
+BLOCK_MS = 100
+TRAILING_SILENCE_SECONDS = 2
+TIMEOUT_SECONDS = 60
+
+
+async def satellite(host: str, port: int, pcm: np.ndarray, delay: float) -> tuple[float, float] | None:
+    """Send the command, return (time to first audio, end to end latency) in seconds."""
+    await asyncio.sleep(delay)
+    reader, writer = await asyncio.open_connection(host, port)
+    block = SAMPLE_RATE * BLOCK_MS // 1000
+    silence = np.zeros(SAMPLE_RATE * TRAILING_SILENCE_SECONDS, dtype=np.int16)
+    speech_end = None
+
+    async def send():
+        nonlocal speech_end
+        audio = np.concatenate([pcm, silence])
+        for i in range(0, len(audio), block):
+            write_message(writer, MessageType.AUDIO, mu_law_encode(audio[i:i + block]))
+            await writer.drain()
+            if i + block >= len(pcm) and speech_end is None:
+                speech_end = time.perf_counter()
+            await asyncio.sleep(BLOCK_MS / 1000)
+        # Keep the microphone "open" with silence until the response has been received.
+        while True:
+            write_message(writer, MessageType.AUDIO, mu_law_encode(np.zeros(block, dtype=np.int16)))
+            await writer.drain()
+            await asyncio.sleep(BLOCK_MS / 1000)
+
+    async def receive() -> tuple[float, float]:
+        first_audio = None
+        while True:
+            message_type, _ = await read_message(reader)
+            if message_type == MessageType.TTS_AUDIO and first_audio is None:
+                first_audio = time.perf_counter()
+            if message_type == MessageType.TTS_END:
+                done = time.perf_counter()
+                return first_audio - speech_end, done - speech_end
+
+    sender = asyncio.create_task(send())
+    try:
+        return await asyncio.wait_for(receive(), timeout=TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        sender.cancel()
+        writer.close()
+
+
+async def main(wav_path: str, n_satellites: int, host: str, port: int):
+    """Run all satellites concurrently and print latency percentiles."""
+    pcm = read_wav(wav_path)
+    rng = np.random.default_rng(0)
+    # Spread the starts a little, people in different rooms don't talk in perfect sync.
+    delays = rng.uniform(0, 1, size=n_satellites)
+    results = await asyncio.gather(*[satellite(host, port, pcm, delay) for delay in delays])
+    completed = [result for result in results if result is not None]
+    print(f"{len(completed)}/{n_satellites} satellites got a response within {TIMEOUT_SECONDS} s")
+    if not completed:
+        return
+    first_audio, end_to_end = np.array(completed).T
+    for name, values in [("time to first audio", first_audio), ("end to end", end_to_end)]:
+        print(
+            f"{name:<20} p50 {np.percentile(values, 50):6.2f} s, "
+            f"p95 {np.percentile(values, 95):6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    asyncio.run(main(
+        wav_path=sys.argv[1],
+        n_satellites=int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+        host=sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1",
+        port=config.satellite.port,
+    ))
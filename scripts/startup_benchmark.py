@@ -0,0 +1,64 @@
+"""
+Measure import time and resident memory of the assistant with and without each tool.
+
+Every scenario runs in a fresh interpreter, which imports the assistant entry point
+and then the listed tools through the registry, like the first use of a tool would.
+"all tools" is what was imported at startup before tools were loaded lazily. Peak
+RSS is read from getrusage, models are not loaded so this is the cost of the code
+and its dependencies only.
+
+Usage: python -m scripts.startup_benchmark [repeats]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+from assistant.language_model.action import tools
+
+SCENARIO = """
+import json, resource, sys, time
+start = time.perf_counter()
+import assistant.__main__
+from assistant.language_model.action import tools
+for name in sys.argv[1:]:
+    tools.get(name)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_mb": rss / 1024 ** (2 if sys.platform == "darwin" else 1),
+}))
+"""
+
+
+def measure(names: list[str], repeats: int) -> tuple[float, float]:
+    """Median import seconds and peak RSS in MB when importing the named tools."""
+    runs = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", SCENARIO, *names],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.splitlines()[-1]) # after any log lines
+        for _ in range(repeats)
+    ]
+    return (
+        statistics.median(run["seconds"] for run in runs),
+        max(run["rss_mb"] for run in runs),
+    )
+
+
+def main(repeats: int):
+    """Print import time and RSS for no tools, each tool and all tools."""
+    names = list(tools.active())
+    scenarios = {"no tools": [], **{name: [name] for name in names}, "all tools": names}
+    baseline = None
+    print(f"{'scenario':<18} {'import':>9} {'rss':>9} {'extra rss':>10}")
+    for scenario, scenario_names in scenarios.items():
+        seconds, rss = measure(scenario_names, repeats)
+        baseline = baseline or rss
+        print(f"{scenario:<18} {seconds:>8.2f}s {rss:>6.0f} MB {round(rss - baseline):>7d} MB")
+
+
+if __name__ == "__main__":
+    main(repeats=int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,110 @@
+"""
+Replay a directory of labeled WAV files through speech to text backends.
+
+Every 16 kHz mono WAV file needs a .txt file with the same name containing the
+reference transcription. Each backend runs in its own process so that peak RSS
+can be measured separately. Reports real time factor, peak RSS, word error rate
+and how often the wake word was recognized in files whose reference starts with it.
+
+Usage: python -m scripts.stt_benchmark path/to/corpus [backend ...]
+"""
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from box import Box
+import yaml
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, pcm_to_float, read_wav
+from assistant.speech_to_text.backends import BACKENDS, get_transcriber
+from assistant.utils import WakeWordMatcher
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercase words without punctuation."""
+    return "".join(c for c in text.lower() if c.isalnum() or c.isspace()).split()
+
+
+def word_errors(reference: list[str], hypothesis: list[str]) -> int:
+    """Word level Levenshtein distance."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_corpus(corpus_dir: str) -> list[tuple[str, str]]:
+    """Return (wav path, reference text) pairs."""
+    corpus = []
+    for wav_path in sorted(glob.glob(os.path.join(corpus_dir, "*.wav"))):
+        with open(os.path.splitext(wav_path)[0] + ".txt", "r") as file:
+            corpus.append((wav_path, file.read().strip()))
+    return corpus
+
+
+def run_backend(backend: str, corpus: list[tuple[str, str]], config: Box) -> dict:
+    """Transcribe the corpus with one backend. Runs in a child process."""
+    transcriber = get_transcriber(config=config, backend=backend)
+    matcher = WakeWordMatcher.from_config(config)
+    audio_seconds = 0.0
+    processing_seconds = 0.0
+    n_errors = 0
+    n_reference_words = 0
+    wake_word_hits = []
+    for wav_path, reference in corpus:
+        audio = pcm_to_float(read_wav(wav_path))
+        audio_seconds += len(audio) / SAMPLE_RATE
+        start = time.perf_counter()
+        segments = transcriber.transcribe(audio)
+        processing_seconds += time.perf_counter() - start
+
+        hypothesis = " ".join(segment.text for segment in segments)
+        n_errors += word_errors(normalize(reference), normalize(hypothesis))
+        n_reference_words += len(normalize(reference))
+        if matcher.matches(reference):
+            wake_word_hits.append(matcher.matches(hypothesis))
+    return {
+        "rtf": processing_seconds / max(audio_seconds, 1e-9),
+        # ru_maxrss is in kilobytes on linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "wer": n_errors / max(n_reference_words, 1),
+        "wake_word_hit_rate": sum(wake_word_hits) / max(len(wake_word_hits), 1),
+    }
+
+
+def main(corpus_dir: str, backends: list[str], config: Box):
+    """Benchmark every backend and print a table."""
+    corpus = load_corpus(corpus_dir)
+    print(f"Corpus: {len(corpus)} files")
+    print(f"{'backend':<20} {'RTF':>8} {'peak RSS':>10} {'WER':>8} {'wake word':>10}")
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        with context.Pool(processes=1) as pool:
+            try:
+                result = pool.apply(run_backend, (backend, corpus, config))
+            except Exception as e:
+                print(f"{backend:<20} failed: {e}")
+                continue
+        print(
+            f"{backend:<20} {result['rtf']:>8.3f} {result['peak_rss_mb']:>8.0f}MB "
+            f"{result['wer']:>8.1%} {result['wake_word_hit_rate']:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(
+        corpus_dir=sys.argv[1],
+        backends=sys.argv[2:] or list(BACKENDS),
+        config=config,
+    )
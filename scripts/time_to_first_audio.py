@@ -0,0 +1,89 @@
+"""
+Measure time to first audio for answers, with and without sentence streaming.
+
+The current path waits for the full answer before piper starts, the streaming path
+feeds piper the first sentence while the LLM is still generating the rest. Time is
+measured from sending the question until piper writes its first audio bytes, the
+response cache is disabled so every question reaches the API.
+
+Usage: python -m scripts.time_to_first_audio ["question" ...]
+"""
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Iterable
+from box import Box
+from dotenv import load_dotenv
+import yaml
+
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.tools import answer_question
+from assistant.text_to_speech.model import TTS
+from assistant.text_to_speech.sentences import split_sentences
+
+QUESTIONS = [
+    "Berätta kort om Stockholms historia.",
+    "Hur fungerar en värmepump?",
+    "Varför är himlen blå?",
+]
+
+
+def first_audio_seconds(tts: TTS, lines: Iterable[str], start: float) -> float:
+    """Feed lines to piper and return the seconds from start until its first audio bytes."""
+    process = subprocess.Popen(
+        tts.raw_audio_stream_command(),
+        shell=True,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    first_audio = []
+
+    def read_audio():
+        if process.stdout.read(1):
+            first_audio.append(time.perf_counter())
+        process.stdout.read()
+
+    reader = threading.Thread(target=read_audio)
+    reader.start()
+    for line in lines:
+        process.stdin.write((" ".join(line.split()) + "\n").encode("utf8"))
+        process.stdin.flush()
+    process.stdin.close()
+    process.wait()
+    reader.join()
+    return first_audio[0] - start
+
+
+def main(questions: list[str], config: Box):
+    """Ask every question through both paths and print time to first audio."""
+    llm = LanguageModel(config)
+    llm.cache = None
+    tts = TTS(config)
+
+    def full_answer(question: str) -> Iterable[str]:
+        yield answer_question.main(query=question, llm=llm)
+
+    def streamed_answer(question: str) -> Iterable[str]:
+        return split_sentences(answer_question.stream(query=question, llm=llm))
+
+    paths = {"full": full_answer, "streaming": streamed_answer}
+    results = {name: [] for name in paths}
+    print(f"{'question':<40} {'path':<10} {'first audio':>12}")
+    for question in questions:
+        for name, path in paths.items():
+            start = time.perf_counter()
+            seconds = first_audio_seconds(tts, path(question), start)
+            results[name].append(seconds)
+            print(f"{question[:40]:<40} {name:<10} {seconds:>10.2f} s")
+    for name, seconds in results.items():
+        print(f"{'median':<40} {name:<10} {statistics.median(seconds):>10.2f} s")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(questions=sys.argv[1:] or QUESTIONS, config=config)
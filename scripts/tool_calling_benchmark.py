@@ -0,0 +1,80 @@
+"""
+Compare native tool calling with the old select_action + tool prompt path.
+
+Runs every command through both paths and reports the number of OpenAI round trips
+and the wall clock time per command. Lights and spotify are replaced with fakes so
+that nothing in the home is changed, but the OpenAI requests (and the SMHI request
+for weather commands) are real.
+
+Usage: python -m scripts.tool_calling_benchmark ["command" ...]
+"""
+import sys
+import time
+from box import Box
+from dotenv import load_dotenv
+import yaml
+
+from assistant.language_model.action import run_actions
+from assistant.language_model.model import LanguageModel
+from assistant.language_model.tools import call_tools, light_control, music_control, select_action
+
+COMMANDS = [
+    "Turn off the lights in the kitchen",
+    "Set the color of the living room to blue",
+    "Pause the music",
+    "Play the artist Vengaboys",
+    "What will the weather be like tomorrow?",
+    "What is the capital of Australia?",
+]
+
+
+class FakeSpotify:
+    """Spotify client that does nothing."""
+
+    def devices(self) -> dict:
+        return {"devices": [{"name": config.smart_home.default_spotify_device, "id": "fake"}]}
+
+
+def two_step(query: str, llm: LanguageModel, config: Box) -> str:
+    """The old path, select_action followed by run_actions."""
+    actions, message = select_action.main(query=query, llm=llm, config=config)
+    return message + " " + run_actions(actions=actions, llm=llm, config=config)
+
+
+def main(commands: list[str], config: Box):
+    """Run all commands through both paths and print a table."""
+    light_control.get_hub = lambda: None
+    light_control.perform_light_action = lambda **kwargs: None
+    music_control.get_spotify = FakeSpotify
+    music_control.perform_music_action = lambda **kwargs: ""
+
+    llm = LanguageModel(config)
+    paths = {"two_step": two_step, "native": call_tools.main}
+    totals = {name: [0, 0.0] for name in paths}
+    print(f"{'command':<45} {'path':<10} {'requests':>8} {'seconds':>8}")
+    for command in commands:
+        for name, path in paths.items():
+            n_requests = llm.n_requests
+            start = time.perf_counter()
+            try:
+                path(query=command, llm=llm, config=config)
+            except Exception as e:
+                print(f"{command[:45]:<45} {name:<10} failed: {e}")
+                continue
+            seconds = time.perf_counter() - start
+            n_requests = llm.n_requests - n_requests
+            totals[name][0] += n_requests
+            totals[name][1] += seconds
+            print(f"{command[:45]:<45} {name:<10} {n_requests:>8} {seconds:>8.2f}")
+    for name, (n_requests, seconds) in totals.items():
+        print(
+            f"{'mean':<45} {name:<10} {n_requests / len(commands):>8.2f} "
+            f"{seconds / len(commands):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(commands=sys.argv[1:] or COMMANDS, config=config)
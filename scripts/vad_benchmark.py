@@ -0,0 +1,55 @@
+"""
+Measure voice activity detector throughput in frames per second on a single core.
+
+Run it on the Pi itself to see how much of a core the VAD costs. Pass a 16 kHz mono
+WAV file to benchmark on real audio, otherwise ten minutes of synthetic audio is used.
+
+Usage: OMP_NUM_THREADS=1 taskset -c 0 python -m scripts.vad_benchmark [file.wav]
+"""
+import sys
+import time
+from box import Box
+import numpy as np
+import yaml
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, read_wav
+from assistant.speech_to_text.vad import FRAME_LENGTH, VoiceActivityDetector
+
+CHUNK_MS = 100 # same as the whisper.cpp backend poll interval
+
+
+def synthetic_audio(seconds: int) -> np.ndarray:
+    """Alternating bursts of harmonic 'speech' and background noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    voiced = sum(np.sin(2 * np.pi * f * t) / (k + 1) for k, f in enumerate([150, 300, 450, 600])) * 0.3
+    seconds_of_audio = [
+        voiced if second % 5 in (1, 2) else np.zeros(SAMPLE_RATE)
+        for second in range(seconds)
+    ]
+    audio = np.concatenate(seconds_of_audio) + rng.standard_normal(seconds * SAMPLE_RATE) * 0.003
+    return (audio * 32767).astype(np.int16)
+
+
+def main(audio: np.ndarray, config: Box):
+    """Feed audio through the detector in poll sized chunks and print throughput."""
+    vad = VoiceActivityDetector(config)
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    n_events = 0
+    start = time.process_time()
+    for i in range(0, len(audio), chunk):
+        n_events += len(vad.process(audio[i:i + chunk]))
+    cpu_seconds = time.process_time() - start
+
+    n_frames = len(audio) // FRAME_LENGTH
+    audio_seconds = len(audio) / SAMPLE_RATE
+    print(f"Audio: {audio_seconds:.0f} s, {n_frames} frames of {FRAME_LENGTH} samples, {n_events} events")
+    print(f"Throughput: {n_frames / cpu_seconds:,.0f} frames/s ({audio_seconds / cpu_seconds:,.0f}x real time)")
+    print(f"CPU usage while listening: {cpu_seconds / audio_seconds:.2%} of one core")
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    audio = read_wav(sys.argv[1]) if len(sys.argv) > 1 else synthetic_audio(seconds=600)
+    main(audio=audio, config=config)
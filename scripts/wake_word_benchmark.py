@@ -0,0 +1,50 @@
+"""
+Benchmark the wake word gate on a corpus of WAV files.
+
+The corpus directory should contain two folders with 16 kHz mono WAV files:
+    positive/ - phrases starting with the wake word
+    negative/ - anything else (tv chatter, other names, silence...)
+
+Usage: python -m scripts.wake_word_benchmark path/to/corpus
+"""
+import glob
+import os
+import sys
+import time
+from box import Box
+import yaml
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, read_wav
+from assistant.speech_to_text.wake_word import WakeWordDetector
+
+
+def main(corpus_dir: str, config: Box):
+    """Run detector on every file in corpus and print cpu usage and error rates."""
+    detector = WakeWordDetector(config)
+    results = {}
+    audio_seconds = 0.0
+    cpu_seconds = 0.0
+    for label in ["positive", "negative"]:
+        detections = []
+        for path in sorted(glob.glob(os.path.join(corpus_dir, label, "*.wav"))):
+            pcm = read_wav(path)
+            audio_seconds += len(pcm) / SAMPLE_RATE
+            start = time.process_time()
+            detections.append(detector.detect(pcm))
+            cpu_seconds += time.process_time() - start
+        results[label] = detections
+
+    positives, negatives = results["positive"], results["negative"]
+    false_reject_rate = 1 - sum(positives) / max(len(positives), 1)
+    false_accept_rate = sum(negatives) / max(len(negatives), 1)
+    print(f"Files: {len(positives)} positive, {len(negatives)} negative ({audio_seconds:.1f} s audio)")
+    print(f"Sensitivity: {detector.sensitivity} (max distance {detector.max_distance:.2f})")
+    print(f"False reject rate: {false_reject_rate:.1%}")
+    print(f"False accept rate: {false_accept_rate:.1%}")
+    print(f"CPU time: {cpu_seconds:.2f} s ({cpu_seconds / max(audio_seconds, 1e-9):.2%} of one core)")
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(corpus_dir=sys.argv[1], config=config)
@@ -0,0 +1,72 @@
+"""
+Compare the phonetic WakeWordMatcher with the old SequenceMatcher based contains_wake_word
+on a labeled corpus of transcriptions, reporting accuracy and cost per call.
+
+The corpus is a tab separated file with a label (start, anywhere or none, depending
+on where the wake word is) and a sentence.
+
+Usage: python -m scripts.wake_word_matcher_benchmark [corpus.tsv]
+"""
+import csv
+import sys
+import time
+from box import Box
+import yaml
+
+from assistant.utils import WakeWordMatcher, contains_wake_word
+
+DEFAULT_CORPUS = "scripts/data/wake_word_corpus.tsv"
+REPEATS = 1000
+
+
+def evaluate(name: str, matches, corpus: list[tuple[str, str]], positive_labels: set[str]):
+    """Print accuracy, misses and per call cost of one matching function."""
+    predictions = [matches(sentence) for _, sentence in corpus]
+    labels = [label in positive_labels for label, _ in corpus]
+    accuracy = sum(p == l for p, l in zip(predictions, labels)) / len(corpus)
+    false_rejects = [s for (_, s), p, l in zip(corpus, predictions, labels) if l and not p]
+    false_accepts = [s for (_, s), p, l in zip(corpus, predictions, labels) if p and not l]
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for _, sentence in corpus:
+            matches(sentence)
+    per_call = (time.perf_counter() - start) / (REPEATS * len(corpus))
+
+    print(f"{name}: accuracy {accuracy:.1%}, {per_call * 1e6:.1f} µs per call")
+    for sentence in false_rejects:
+        print(f"    missed: {sentence}")
+    for sentence in false_accepts:
+        print(f"    false accept: {sentence}")
+
+
+def main(corpus_path: str, config: Box):
+    """Evaluate both matchers in start-of-sentence and anywhere mode."""
+    with open(corpus_path, "r") as file:
+        corpus = [(row["label"], row["sentence"]) for row in csv.DictReader(file, delimiter="\t")]
+    speech_config = config.speech_to_text
+    wake_words = [speech_config.wake_word] + list(speech_config.wake_word_aliases)
+
+    print(f"Corpus: {len(corpus)} sentences, wake words {wake_words}\n")
+    print("Wake word at the start of the sentence:")
+    evaluate(
+        "  contains_wake_word",
+        lambda sentence: contains_wake_word(sentence, speech_config.wake_word, speech_config.similarity_score),
+        corpus,
+        positive_labels={"start"},
+    )
+    evaluate("  WakeWordMatcher", WakeWordMatcher(wake_words).matches, corpus, positive_labels={"start"})
+
+    print("\nWake word anywhere in the sentence:")
+    evaluate(
+        "  WakeWordMatcher",
+        WakeWordMatcher(wake_words, anywhere=True).matches,
+        corpus,
+        positive_labels={"start", "anywhere"},
+    )
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as file:
+        config = Box(yaml.safe_load(file))
+    main(corpus_path=sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS, config=config)
@@ -0,0 +1,93 @@
+"""
+Compare memory and latency of the old join-and-convert audio path in whisper_py
+with the preallocated ring buffer, for simulated 1 and 10 minute sessions.
+
+Audio arrives in record_timeout sized chunks, like from speech_recognition.
+Pass a whisper model name (e.g. tiny) to also include decoding time on the CPU.
+
+Usage: python -m scripts.whisper_py_benchmark [model]
+"""
+from queue import Queue
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from assistant.speech_to_text.audio import SAMPLE_RATE, RingBuffer
+
+RECORD_TIMEOUT = 2
+WINDOW_SECONDS = 30
+PHRASE_CHUNKS = 3 # chunks per phrase before a pause
+
+
+def make_chunks(session_seconds: int) -> list[bytes]:
+    """Random int16 audio chunks covering the whole session."""
+    rng = np.random.default_rng(0)
+    n_chunks = session_seconds // RECORD_TIMEOUT
+    return [
+        (rng.standard_normal(RECORD_TIMEOUT * SAMPLE_RATE) * 3000).astype(np.int16).tobytes()
+        for _ in range(n_chunks)
+    ]
+
+
+def old_path(chunks: list[bytes], decode) -> list[float]:
+    """Join queued bytes and convert to a fresh float array every poll."""
+    queue = Queue()
+    latencies = []
+    for chunk in chunks:
+        queue.put(chunk)
+        start = time.perf_counter()
+        audio_data = b''.join(queue.queue)
+        queue.queue.clear()
+        audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+        decode(audio_np)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def ring_buffer_path(chunks: list[bytes], decode) -> list[float]:
+    """Write chunks in place and decode a sliding window from the phrase start."""
+    buffer = RingBuffer(capacity=WINDOW_SECONDS * SAMPLE_RATE)
+    window = np.empty(buffer.capacity, dtype=np.float32)
+    phrase_start = 0
+    latencies = []
+    for i, chunk in enumerate(chunks):
+        buffer.write(np.frombuffer(chunk, dtype=np.int16))
+        start = time.perf_counter()
+        decode(buffer.read_since(phrase_start, out=window))
+        latencies.append(time.perf_counter() - start)
+        if (i + 1) % PHRASE_CHUNKS == 0:
+            phrase_start = buffer.total_written
+    return latencies
+
+
+def measure(name: str, path, chunks: list[bytes], decode):
+    """Print peak traced memory and poll latency for one path."""
+    tracemalloc.start()
+    latencies = np.array(path(chunks, decode)) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {name:<12} peak mem {peak / 1e6:7.2f} MB, "
+        f"poll latency p50 {np.percentile(latencies, 50):8.2f} ms, "
+        f"p95 {np.percentile(latencies, 95):8.2f} ms"
+    )
+
+
+def main(model_name: str | None):
+    """Run both paths for 1 and 10 minute sessions."""
+    decode = lambda audio: None
+    if model_name:
+        import whisper
+        model = whisper.load_model(model_name, device="cpu")
+        decode = lambda audio: model.transcribe(audio, fp16=False, language="swedish")
+
+    for minutes in [1, 10]:
+        chunks = make_chunks(minutes * 60)
+        print(f"{minutes} minute session ({len(chunks)} chunks):")
+        measure("old", old_path, chunks, decode)
+        measure("ring buffer", ring_buffer_path, chunks, decode)
+
+
+if __name__ == "__main__":
+    main(model_name=sys.argv[1] if len(sys.argv) > 1 else None)